@@ -0,0 +1,59 @@
+# coding: utf-8
+""" Measures compression ratio and CPU cost of compressed codec variants.
+
+Usage (from repository root):
+
+    python benchmarks/compression.py [rows ...]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from django_rpc.celery import codecs
+
+
+def measure(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def make_rows(size):
+    return [{
+        'id': i,
+        'char_field': 'row %s' % i,
+        'int_field': i * 10,
+        'dt_field': '2017-03-01T10:55:18.055Z',
+        'fk': i % 100,
+    } for i in range(size)]
+
+
+def main(sizes):
+    for size in sizes:
+        rows = make_rows(size)
+        data = codecs.x_rpc_json_dumps(rows).encode('utf-8')
+        encode = measure(lambda: codecs.x_rpc_json_dumps(rows))
+        print('%7d rows: %9d bytes, json encode %.2fms' % (
+            size, len(data), encode * 1000))
+        for name, (compress, decompress) in sorted(
+                codecs.COMPRESSORS.items()):
+            payload = compress(data)
+            c = measure(lambda: compress(data))
+            d = measure(lambda: decompress(payload))
+            print('    %-5s %9d bytes, ratio x%.1f, compress %.2fms, '
+                  'decompress %.2fms' % (name, len(payload),
+                                         float(len(data)) / len(payload),
+                                         c * 1000, d * 1000))
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [10, 100, 1000, 10000, 100000])
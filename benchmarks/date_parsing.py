@@ -0,0 +1,77 @@
+# coding: utf-8
+""" Compares strptime and slicing parsers for dates() and datetimes().
+
+Usage (from repository root):
+
+    python benchmarks/date_parsing.py [values ...]
+"""
+from __future__ import print_function
+
+import datetime
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytz
+
+from django_rpc.celery import dates
+
+
+def measure(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def strptime_datetimes(values, tzinfo):
+    """ Previous DateTimeIterable implementation."""
+    result = []
+    for item in values:
+        dt = datetime.datetime.strptime(item, '%Y-%m-%dT%H:%M:%SZ')
+        dt = datetime.datetime(*dt.timetuple()[:6], tzinfo=pytz.utc)
+        result.append(dt.astimezone(tzinfo))
+    return result
+
+
+def strptime_dates(values):
+    """ Previous DateIterable implementation."""
+    return [datetime.datetime.strptime(v, '%Y-%m-%d').date() for v in values]
+
+
+def main(sizes):
+    start = datetime.datetime(2017, 1, 1)
+    moscow = pytz.timezone('Europe/Moscow')
+    for size in sizes:
+        minutes = [(start + datetime.timedelta(minutes=i)).strftime(
+            '%Y-%m-%dT%H:%M:%SZ') for i in range(size)]
+        days = [(start + datetime.timedelta(days=i % 3650)).strftime(
+            '%Y-%m-%d') for i in range(size)]
+        variants = [
+            ('datetimes utc', lambda: strptime_datetimes(minutes, pytz.utc),
+             lambda: dates.parse_datetimes(minutes)),
+            ('datetimes moscow', lambda: strptime_datetimes(minutes, moscow),
+             lambda: dates.parse_datetimes(minutes, moscow)),
+            ('dates', lambda: strptime_dates(days),
+             lambda: dates.parse_dates(days)),
+        ]
+        if dates.numpy is not None:
+            variants.append((
+                'datetime64', lambda: strptime_datetimes(minutes, pytz.utc),
+                lambda: dates.to_datetime64(minutes)))
+        for name, old, new in variants:
+            old_time = measure(old)
+            new_time = measure(new)
+            print('%7d values, %-16s strptime %.3fs, batched %.3fs, '
+                  'speedup x%.1f' % (size, name, old_time, new_time,
+                                     old_time / new_time))
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [525600])
@@ -0,0 +1,92 @@
+# coding: utf-8
+""" Measures client-side conversion of fetched rows to model instances.
+
+Usage (from repository root):
+
+    python benchmarks/instantiate.py [rows ...]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'example_project')]
+os.environ['DJANGO_SETTINGS_MODULE'] = 'settings_client'
+
+import django
+
+django.setup()
+
+from django_rpc.models import RpcModel
+from django_rpc.models.fields import ForeignKey
+from rpc_client.models import ClientModel
+
+
+class BenchFKModel(RpcModel):
+    class Rpc:
+        app_label = 'rpc_server'
+        name = 'FKModel'
+
+
+class BenchModel(RpcModel):
+    class Rpc:
+        app_label = 'rpc_server'
+        name = 'ServerModel'
+
+    fk = ForeignKey(BenchFKModel)
+
+
+def measure(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def make_rows(size, nested=False):
+    rows = []
+    for i in range(size):
+        row = {
+            'id': i,
+            'char_field': 'row %s' % i,
+            'int_field': i,
+            'dt_field': '2017-03-01T10:55:18.055000Z',
+            'd_field': '2017-03-01',
+            'fk_id': i % 10,
+        }
+        if nested:
+            del row['fk_id']
+            row['fk'] = {'id': i % 10, 'name': str(i % 10)}
+        rows.append(row)
+    return rows
+
+
+def main(sizes):
+    variants = [
+        ('django', ClientModel.objects.all(), False),
+        ('django select_related', ClientModel.objects.select_related('fk'),
+         True),
+        ('django only', ClientModel.objects.only('char_field'), False),
+        ('django lazy', ClientModel.objects.lazy(), False),
+        ('native', BenchModel.objects.all(), False),
+        ('native select_related', BenchModel.objects.select_related('fk'),
+         True),
+    ]
+    for size in sizes:
+        rows = make_rows(size)
+        nested_rows = make_rows(size, nested=True)
+        for name, qs, nested in variants:
+            data = nested_rows if nested else rows
+            elapsed = measure(
+                lambda: list(qs._iterable_class(qs).iterate(data)))
+            print('%7d rows, %-22s %.3fs, %7d rows/s' % (
+                size, name, elapsed, size / elapsed))
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [100000])
@@ -0,0 +1,63 @@
+# coding: utf-8
+""" Compares DRF and values_list() serialization paths of FetchTask.
+
+Usage (from repository root):
+
+    python benchmarks/serialization.py [rows ...]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'example_project')]
+os.environ['DJANGO_SETTINGS_MODULE'] = 'settings_server'
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+
+# never touch example database
+settings.DATABASES['default']['TEST'] = {'NAME': ':memory:'}
+connection.creation.create_test_db(verbosity=0)
+
+from django_rpc.celery.tasks import fetch
+from rpc_server.models import ServerModel
+
+
+def measure(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(sizes):
+    created = 0
+    fields = fetch.get_fields(ServerModel)
+    for size in sizes:
+        ServerModel.objects.bulk_create(
+            ServerModel(char_field='row %s' % i, int_field=i)
+            for i in range(created, size))
+        created = size
+        qs = ServerModel.objects.order_by('pk')[:size]
+        converters = fetch.get_flat_converters(ServerModel, fields)
+
+        drf = measure(lambda: fetch.serialize(
+            qs.all(), model=ServerModel, fields=fields))
+        flat = measure(lambda: fetch.serialize_flat(
+            qs.all(), fields, converters))
+        print('%7d rows: drf %.3fs, values_list %.3fs, speedup x%.1f' % (
+            size, drf, flat, drf / flat))
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [10000, 100000])
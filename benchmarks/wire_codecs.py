@@ -0,0 +1,70 @@
+# coding: utf-8
+""" Compares x-rpc-json, x-rpc-json2 and x-rpc-msgpack codecs round trips.
+
+Usage (from repository root):
+
+    python benchmarks/wire_codecs.py [rows ...]
+"""
+from __future__ import print_function
+
+import datetime
+import decimal
+import os
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytz
+
+from django_rpc.celery import codecs
+
+
+def measure(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def make_rows(size):
+    now = datetime.datetime.now(pytz.utc)
+    return [{
+        'id': i,
+        'char_field': 'row %s' % i,
+        'int_field': i * 10,
+        'dt_field': now,
+        'date_field': now.date(),
+        'decimal_field': decimal.Decimal(i) / 100,
+        'uuid_field': uuid.uuid4(),
+    } for i in range(size)]
+
+
+def main(sizes):
+    variants = [
+        ('json', codecs.x_rpc_json_dumps, codecs.x_rpc_json_loads),
+        ('json2', codecs.x_rpc_json2_dumps, codecs.x_rpc_json2_loads),
+    ]
+    if codecs.msgpack is not None:
+        variants.append(('msgpack', codecs.x_rpc_msgpack_dumps,
+                         codecs.x_rpc_msgpack_loads))
+    for size in sizes:
+        rows = make_rows(size)
+        results = []
+        for name, dumps, loads in variants:
+            payload = dumps(rows)
+            encode = measure(lambda: dumps(rows))
+            decode = measure(lambda: loads(payload))
+            results.append((name, len(payload), encode, decode))
+        for name, length, encode, decode in results:
+            print('%7d rows %-8s %9d bytes, encode %.3fs, decode %.3fs' % (
+                size, name, length, encode, decode))
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [10000, 100000])
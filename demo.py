@@ -4,8 +4,8 @@
 # В Django-окружении:
 from django.conf import settings
 
-from django.db import models, connections
-from django_rpc.models import RpcModel
+from django.db import models
+from django_rpc.models import RpcModel, gather
 
 settings.DATABASES['rpc'] = {
     'BROKER_URL': 'amqp://guest@localhost/',
@@ -64,7 +64,7 @@ item = f2.result()
 
 # отправка запросов пачками
 
-result1, result2 = connections['rpc'].cursor().gather(f1, f2)
+result1, result2 = gather(f1, f2, timeout=10)
 
 # h2. Delayed
 
@@ -0,0 +1,102 @@
+# coding: utf-8
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django_rpc.celery.codecs import RpcJsonEncoder
+
+
+class KeyEncoder(RpcJsonEncoder):
+    """ Encodes expressions without jsonpickle, as its output varies."""
+    legacy_expressions = False
+
+
+class LRUCache(object):
+    """ Bounded mapping with least-recently-used eviction and optional TTL.
+
+    Collects hit, miss and eviction counters.
+    """
+    missing = object()
+
+    def __init__(self, maxsize):
+        assert maxsize > 0, "maxsize must be positive"
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires < time.time():
+                self.misses += 1
+                return default
+            # move to the end of eviction queue
+            self._data[key] = expires, value
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = expires, value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {'size': len(self), 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions}
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RpcResultCache(LRUCache):
+    """ Cache for fetch results, keyed by model and canonical request hash.
+
+    Values are copied on set and on get, so callers may modify results.
+    """
+
+    def get(self, key, default=None):
+        value = super(RpcResultCache, self).get(key, self.missing)
+        if value is self.missing:
+            return default
+        return copy.deepcopy(value)
+
+    def set(self, key, value, ttl=None):
+        super(RpcResultCache, self).set(key, copy.deepcopy(value), ttl=ttl)
+
+    @staticmethod
+    def make_key(app_label, name, *args, **kwargs):
+        data = json.dumps([args, kwargs], cls=KeyEncoder, sort_keys=True)
+        digest = hashlib.sha1(data.encode('utf-8')).hexdigest()
+        return app_label, name, digest
+
+    def invalidate(self, app_label, name):
+        """ Removes all cached results for model."""
+        for key in self.keys():
+            if key[:2] == (app_label, name):
+                self.delete(key)
@@ -1,6 +1,10 @@
 # coding: utf-8
+import functools
+
 import celery
 
+from django_rpc.celery import codecs, defaults
+from django_rpc.celery.cache import RpcResultCache
 from django_rpc.celery.conf import settings
 
 
@@ -9,7 +13,9 @@ TASKS = (
     'django_rpc.insert',
     'django_rpc.update',
     'django_rpc.delete',
-    'django_rpc.get_or_create'
+    'django_rpc.get_or_create',
+    'django_rpc.batch',
+    'django_rpc.bulk_update',
 )
 
 
@@ -26,6 +32,92 @@ def task(app, name):
     return app.task(name=name)(stub)
 
 
+class FetchResult(object):
+    """ AsyncResult-like proxy converting fetch result once received."""
+
+    def __init__(self, result, load):
+        self.result = result
+        self.load = load
+        self._loaded = False
+        self._value = None
+
+    def ready(self):
+        return self._loaded or self.result.ready()
+
+    def get(self, timeout=None):
+        if not self._loaded:
+            self._value = self.load(self.result.get(timeout=timeout))
+            self._loaded = True
+        return self._value
+
+
+class BatchItemResult(object):
+    """ AsyncResult-like proxy for single fetch result in batch."""
+
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+
+    def ready(self):
+        return self.batch.ready()
+
+    def get(self, timeout=None):
+        return self.batch.get(timeout=timeout)[self.index]
+
+
+class RpcBatch(object):
+    """ Collects fetch requests to send them with single batch task.
+
+    >>> with client.batch() as batch:
+    ...     r1 = batch.fetch_async('app_label', 'Model', trace1)
+    ...     r2 = batch.fetch_async('app_label', 'Model', trace2)
+    >>> data1, data2 = r1.get(), r2.get()
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._specs = []
+        self._result = None
+        self._values = None
+
+    def fetch_async(self, app_label, name, trace, **kwargs):
+        assert self._result is None, "batch is already sent"
+        if self._client.columnar:
+            kwargs['columnar'] = True
+        self._specs.append([[app_label, name, trace], kwargs])
+        result = BatchItemResult(self, len(self._specs) - 1)
+        # noinspection PyProtectedMember
+        return FetchResult(result, functools.partial(
+            self._client._load_fetch_result, kwargs))
+
+    def send(self):
+        assert self._result is None, "batch is already sent"
+        if not self._specs:
+            self._values = []
+            return None
+        # noinspection PyProtectedMember
+        self._result = self._client._batch.delay(self._specs)
+        return self._result
+
+    def ready(self):
+        if self._values is not None:
+            return True
+        return self._result is not None and self._result.ready()
+
+    def get(self, timeout=None):
+        if self._values is None:
+            assert self._result is not None, "batch is not sent yet"
+            self._values = self._result.get(timeout=timeout)
+        return self._values
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.send()
+
+
 class RpcClient(object):
     clients = {}
 
@@ -36,6 +128,14 @@ class RpcClient(object):
         for name in set(TASKS) - set(app.tasks.keys()):
             task(app, name)
         self.__app = app
+        self.columnar = bool(config.get('COLUMNAR_RESULTS'))
+        # typed codecs keep dates in columnar result rows
+        self.typed_results = codecs.is_typed_codec(
+            config.get('CELERY_RESULT_SERIALIZER'))
+        self.in_bulk_batch_size = config.get(
+            'IN_BULK_BATCH_SIZE', defaults.IN_BULK_BATCH_SIZE)
+        cache_size = config.get('RESULT_CACHE_SIZE')
+        self.cache = RpcResultCache(cache_size) if cache_size else None
 
     @property
     def _app(self):
@@ -53,6 +153,10 @@ class RpcClient(object):
     def _update(self):
         return self._app.tasks['django_rpc.update']
 
+    @property
+    def _bulk_update(self):
+        return self._app.tasks['django_rpc.bulk_update']
+
     @property
     def _delete(self):
         return self._app.tasks['django_rpc.delete']
@@ -61,34 +165,133 @@ class RpcClient(object):
     def _get_or_create(self):
         return self._app.tasks['django_rpc.get_or_create']
 
+    @property
+    def _batch(self):
+        return self._app.tasks['django_rpc.batch']
+
     def fetch(self, app_label, name, trace, fields=None, extra_fields=None,
-              exclude_fields=None, native=False, limits=(0, None)):
-        result = self._fetch.delay(
-            app_label,
-            name,
-            trace,
-            fields=fields,
-            extra_fields=extra_fields,
-            exclude_fields=exclude_fields,
-            native=native,
-            limits=limits)
-        return result.get()
+              exclude_fields=None, native=False, limits=(0, None),
+              keyset=None, cache_ttl=None, columnar=False,
+              with_total=False):
+        """ Fetches data from rpc server.
+
+        :param cache_ttl: if set and result cache is enabled, result is
+            cached for cache_ttl seconds.
+        :param columnar: request columnar result format even if it is
+            disabled in settings.
+        :param with_total: request dict with "results" and "total" count.
+        """
+        kwargs = dict(fields=fields, extra_fields=extra_fields,
+                      exclude_fields=exclude_fields, native=native,
+                      limits=limits)
+        # old workers don't accept keyset argument
+        if keyset is not None:
+            kwargs['keyset'] = keyset
+        if columnar:
+            kwargs['columnar'] = True
+        if with_total:
+            kwargs['with_total'] = True
+        key = None
+        if cache_ttl and self.cache is not None:
+            key = self.cache.make_key(app_label, name, trace, **kwargs)
+            cached = self.cache.get(key, self.cache.missing)
+            if cached is not self.cache.missing:
+                return cached
+        result = self.fetch_async(app_label, name, trace, **kwargs).get()
+        if key is not None:
+            self.cache.set(key, result, ttl=cache_ttl)
+        return result
+
+    def fetch_async(self, app_label, name, trace, fields=None,
+                    extra_fields=None, exclude_fields=None, native=False,
+                    limits=(0, None), keyset=None, columnar=False,
+                    with_total=False):
+        """ Sends fetch task without waiting for result.
+
+        :returns: celery AsyncResult instance
+        """
+        kwargs = dict(fields=fields, extra_fields=extra_fields,
+                      exclude_fields=exclude_fields, native=native,
+                      limits=limits)
+        # old workers don't accept keyset argument
+        if keyset is not None:
+            kwargs['keyset'] = keyset
+        if columnar or self.columnar:
+            kwargs['columnar'] = True
+        if with_total:
+            kwargs['with_total'] = True
+        result = self._fetch.delay(app_label, name, trace, **kwargs)
+        return FetchResult(result, functools.partial(
+            self._load_fetch_result, kwargs))
+
+    def _load_fetch_result(self, kwargs, result):
+        """ Unpacks columnar envelope of result requested with kwargs."""
+        if not kwargs.get('columnar'):
+            return result
+        if kwargs.get('with_total') or kwargs.get('keyset'):
+            result['results'] = self._load_columnar(result['results'])
+            return result
+        return self._load_columnar(result)
+
+    def _load_columnar(self, data):
+        data = codecs.load_columnar(data)
+        if codecs.is_columnar(data) and not self.typed_results:
+            # values of dicts are parsed by result codec, but rows are lists;
+            # they are parsed on first use, by lazy querysets - per value
+            data.parsed = False
+        return data
+
+    def batch(self):
+        """ Returns context manager collecting fetch requests."""
+        return RpcBatch(self)
 
     def insert(self, app_label, name, objs, return_id=False):
         result = self._insert.delay(app_label, name, objs, return_id=return_id)
-        return result.get()
+        return self._invalidated(app_label, name, result)
 
-    def update(self, app_label, name, trace, updates, single=False):
+    def update(self, app_label, name, trace, updates, single=False,
+               missing_ok=False):
+        kwargs = {'single': single}
+        # old workers don't accept missing_ok argument
+        if missing_ok:
+            kwargs['missing_ok'] = True
         result = self._update.delay(app_label, name, trace, updates,
-                                    single=single)
-        return result.get()
+                                    **kwargs)
+        return self._invalidated(app_label, name, result)
+
+    def bulk_update(self, app_label, name, fields, rows):
+        """
+        :param fields: names of updated fields
+        :param rows: lists of primary key and fields values
+        :returns: count of updated rows
+        """
+        result = self._bulk_update.delay(app_label, name, fields, rows)
+        return self._invalidated(app_label, name, result)
 
     def delete(self, app_label, name, trace):
-        return self._delete.delay(app_label, name, trace).get()
+        result = self._delete.delay(app_label, name, trace)
+        return self._invalidated(app_label, name, result)
 
     def get_or_create(self, app_label, name, kwargs, update=False):
-        return self._get_or_create.delay(app_label, name, kwargs,
-                                         update=update).get()
+        result = self._get_or_create.delay(app_label, name, kwargs,
+                                           update=update)
+        return self._invalidated(app_label, name, result)
+
+    def invalidate(self, app_label, name):
+        """ Drops cached fetch results for model."""
+        if self.cache is not None:
+            self.cache.invalidate(app_label, name)
+
+    def _invalidated(self, app_label, name, result):
+        """ Waits for write task result and invalidates model cache.
+
+        Cache is invalidated after task completion, so results cached by
+        concurrent reads while the task was executing are dropped too.
+        """
+        try:
+            return result.get()
+        finally:
+            self.invalidate(app_label, name)
 
     @classmethod
     def from_db(cls, db):
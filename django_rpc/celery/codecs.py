@@ -2,23 +2,62 @@ import datetime
 import decimal
 import json
 import re
+import struct
 import uuid
+import zlib
 
 import jsonpickle
 import pytz
 import six
+from kombu.exceptions import SerializerNotInstalled
 from kombu.utils.encoding import bytes_t
 
+from django_rpc.celery import dates, defaults
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# compression name -> (compress, decompress)
+COMPRESSORS = {'zlib': (zlib.compress, zlib.decompress)}
+
+try:
+    import lz4.frame
+    COMPRESSORS['lz4'] = (lz4.frame.compress, lz4.frame.decompress)
+except ImportError:
+    pass
+
+try:
+    import zstandard
+    COMPRESSORS['zstd'] = (
+        lambda data: zstandard.ZstdCompressor().compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data))
+except ImportError:
+    pass
+
+try:
+    # C-accelerated json with object_hook and default support
+    import simplejson as fastjson
+    # keep Decimal and namedtuple values for encoder default()
+    FASTJSON_OPTIONS = {'use_decimal': False, 'namedtuple_as_object': False}
+except ImportError:
+    fastjson = json
+    FASTJSON_OPTIONS = {}
+
 try:
     # Django support
     from django.utils.functional import Promise
     from django.utils.encoding import smart_str
     from django.db.models import Q, Aggregate
+    from django_rpc.celery.expressions import (
+        is_expression, encode_expression, decode_expression)
 
     has_django = True
 except ImportError:
     has_django = False
     smart_str = Promise = Q = Aggregate = None
+    is_expression = encode_expression = decode_expression = None
 
 
 class RpcJsonEncoder(json.JSONEncoder):
@@ -30,6 +69,8 @@ class RpcJsonEncoder(json.JSONEncoder):
     https://github.com/tomchristie/django-rest-framework/blob/master/rest_framework/utils/encoders.py
 
     """
+    # Q objects and aggregates are sent in jsonpickle format
+    legacy_expressions = True
 
     # noinspection PyArgumentList
     def _default(self, o):
@@ -66,10 +107,11 @@ class RpcJsonEncoder(json.JSONEncoder):
         def default(self, o):
             if isinstance(o, Promise):
                 return smart_str(o)
-            elif isinstance(o, Q):
-                return {'_': jsonpickle.encode(o)}
-            elif isinstance(o, Aggregate):
+            elif self.legacy_expressions and isinstance(o, (Q, Aggregate)):
+                # jsonpickle format is kept for workers of previous versions
                 return {'_': jsonpickle.encode(o)}
+            elif is_expression(o):
+                return {'_expr': encode_expression(o)}
             else:
                 return self._default(o)
     else:
@@ -99,7 +141,11 @@ class RpcJsonDecoder(json.JSONDecoder):
     def _object_hook(self, val):
         """ Iterate through dict for additional conversion.
         """
-        if tuple(val.keys()) == ('_',):
+        keys = tuple(val.keys())
+        if keys == ('_expr',):
+            return decode_expression(val['_expr'])
+        if keys == ('_',):
+            # jsonpickle format of previous versions
             return self._parse_type(val['_'])
         for k, v in six.iteritems(val):
             new = self._parse_type(v)
@@ -108,29 +154,91 @@ class RpcJsonDecoder(json.JSONDecoder):
             val[k] = new
         return val
 
-    def _parse_type(self, v):
+    @classmethod
+    def _parse_type(cls, v):
         if not isinstance(v, six.string_types):
             return NotImplemented
-        if re.search(self.Q_OBJECT_SIGNATURE, v):
+        if re.search(cls.Q_OBJECT_SIGNATURE, v):
             return jsonpickle.decode(v)
-        if re.search(self.AGGREGATE_SIGNATURE, v):
+        if re.search(cls.AGGREGATE_SIGNATURE, v):
             return jsonpickle.decode(v)
-        m = re.match(self.DT_SIGNATURE, v)
-        if m:
-            if m.group(1):
-                dt = datetime.datetime.strptime(v, '%Y-%m-%dT%H:%M:%S.%fZ')
-            else:
-                dt = datetime.datetime.strptime(v, '%Y-%m-%dT%H:%M:%SZ')
-            return datetime.datetime(*dt.timetuple()[:6],
-                                     microsecond=dt.microsecond,
-                                     tzinfo=pytz.utc)
-        m = re.match(self.D_SIGNATURE, v)
-        if m:
-            dt = datetime.datetime.strptime(v, '%Y-%m-%d')
-            return dt.date()
+        m = re.match(cls.DT_SIGNATURE, v)
+        if m and m.end() == len(v):
+            return dates.parse_datetime(v)
+        m = re.match(cls.D_SIGNATURE, v)
+        if m and m.end() == len(v):
+            return dates.parse_date(v)
         return NotImplemented
 
 
+class ColumnarResult(dict):
+    """ Fetch result in columns + rows format.
+
+    Created by client from envelope of result requested with columnar=True,
+    so user data of same shape is never taken for it.
+    """
+    # False while x-rpc-json dates in rows are not parsed yet
+    parsed = True
+
+    def get_rows(self):
+        """ Returns rows, parsing their values on first call."""
+        if not self.parsed:
+            parse_rows(self['rows'])
+            self.parsed = True
+        return self['rows']
+
+
+def load_columnar(data):
+    """ Unpacks envelope of fetch result requested with columnar=True.
+
+    Server wraps every such result; "columns" is None for results other
+    than rows of dicts, which are sent as "rows" as is.
+    """
+    if data['columns'] is None:
+        return data['rows']
+    return ColumnarResult(columns=data['columns'], rows=data['rows'])
+
+
+def is_columnar(data):
+    """ Checks whether fetch result is in columns + rows format."""
+    return isinstance(data, ColumnarResult)
+
+
+def parse_rows(rows):
+    """ Parses scalar values of columnar fetch result rows in place.
+
+    Required for x-rpc-json results only, where dates are sent as strings.
+    """
+    # noinspection PyProtectedMember
+    parse = RpcJsonDecoder._parse_type
+    for row in rows:
+        for i, v in enumerate(row):
+            new = parse(v)
+            if new is not NotImplemented:
+                row[i] = new
+
+
+def parse_value(v):
+    """ Parses single value of columnar fetch result row."""
+    # noinspection PyProtectedMember
+    new = RpcJsonDecoder._parse_type(v)
+    return v if new is NotImplemented else new
+
+
+def iter_rows(data):
+    """ Iterates through fetch result rows, converting columnar format."""
+    if not is_columnar(data):
+        return iter(data)
+    columns = data['columns']
+    return (dict(zip(columns, row)) for row in data.get_rows())
+
+
+def count_rows(data):
+    if is_columnar(data):
+        return len(data['rows'])
+    return len(data)
+
+
 def x_rpc_json_dumps(obj):
     return json.dumps(obj, cls=RpcJsonEncoder)
 
@@ -141,7 +249,281 @@ def x_rpc_json_loads(s):
     return json.loads(s, cls=RpcJsonDecoder)
 
 
+# codecs preserving date, time and decimal types of result values; workers
+# skip converting such values to strings when sending results with them.
+TYPED_CODECS = frozenset(['x-rpc-json2', 'x-rpc-msgpack'])
+
+
+def is_typed_codec(name):
+    """ Checks whether codec or its compressed variant preserves types."""
+    return name is not None and name.split('+', 1)[0] in TYPED_CODECS
+
+
+# x-rpc-json2 type tag keys, i.e. {"_t": "d", "_v": "2017-01-02"}
+TAG, VALUE = '_t', '_v'
+
+
+def _format_datetime(o):
+    # fixed-width format for slicing parser
+    return '%04d-%02d-%02dT%02d:%02d:%02d.%06d' % (
+        o.year, o.month, o.day, o.hour, o.minute, o.second, o.microsecond)
+
+
+def _parse_datetime(v, tzinfo=None):
+    return datetime.datetime(int(v[0:4]), int(v[5:7]), int(v[8:10]),
+                             int(v[11:13]), int(v[14:16]), int(v[17:19]),
+                             int(v[20:26]), tzinfo=tzinfo)
+
+
+def _parse_date(v):
+    return datetime.date(int(v[0:4]), int(v[5:7]), int(v[8:10]))
+
+
+def _parse_time(v):
+    return datetime.time(int(v[0:2]), int(v[3:5]), int(v[6:8]), int(v[9:15]))
+
+
+class RpcJson2Encoder(fastjson.JSONEncoder):
+    """ Encodes non-json values as tagged objects.
+
+    Aware datetimes are converted to UTC.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            if o.tzinfo is None:
+                return {TAG: 'ndt', VALUE: _format_datetime(o)}
+            return {TAG: 'dt', VALUE: _format_datetime(o.astimezone(pytz.utc))}
+        elif isinstance(o, datetime.date):
+            return {TAG: 'd', VALUE: o.isoformat()}
+        elif isinstance(o, datetime.time):
+            return {TAG: 't', VALUE: '%02d:%02d:%02d.%06d' % (
+                o.hour, o.minute, o.second, o.microsecond)}
+        elif isinstance(o, datetime.timedelta):
+            return {TAG: 'td', VALUE: [o.days, o.seconds, o.microseconds]}
+        elif isinstance(o, decimal.Decimal):
+            return {TAG: 'dec', VALUE: str(o)}
+        elif isinstance(o, uuid.UUID):
+            return {TAG: 'uuid', VALUE: o.hex}
+        elif has_django and is_expression(o):
+            return {TAG: 'expr', VALUE: encode_expression(o)}
+        elif has_django and isinstance(o, Promise):
+            return smart_str(o)
+        elif hasattr(o, 'tolist'):
+            return o.tolist()
+        elif hasattr(o, '__iter__'):
+            return [i for i in o]
+        return super(RpcJson2Encoder, self).default(o)
+
+
+class RpcJson2Decoder(fastjson.JSONDecoder):
+    """ Restores tagged values; plain strings are never parsed."""
+
+    parsers = {
+        'dt': lambda v: _parse_datetime(v, pytz.utc),
+        'ndt': _parse_datetime,
+        'd': _parse_date,
+        't': _parse_time,
+        'td': lambda v: datetime.timedelta(*v),
+        'dec': decimal.Decimal,
+        'uuid': uuid.UUID,
+        'expr': decode_expression,
+    }
+
+    def __init__(self, *args, **kwargs):
+        kwargs['object_hook'] = self._object_hook
+        super(RpcJson2Decoder, self).__init__(*args, **kwargs)
+
+    def _object_hook(self, val):
+        if len(val) == 2 and TAG in val:
+            parse = self.parsers.get(val[TAG])
+            if parse is not None:
+                return parse(val[VALUE])
+        return val
+
+
+def x_rpc_json2_dumps(obj):
+    return fastjson.dumps(obj, cls=RpcJson2Encoder, **FASTJSON_OPTIONS)
+
+
+def x_rpc_json2_loads(s):
+    if isinstance(s, bytes_t):
+        s = s.decode()
+    return fastjson.loads(s, cls=RpcJson2Decoder)
+
+
+# msgpack extension type codes
+EXT_DATETIME = 1
+EXT_DATE = 2
+EXT_TIME = 3
+EXT_TIMEDELTA = 4
+EXT_DECIMAL = 5
+EXT_UUID = 6
+EXT_EXPRESSION = 7
+
+# year, month, day, hour, minute, second, microsecond, is utc
+DATETIME_STRUCT = struct.Struct('>HBBBBBI?')
+DATE_STRUCT = struct.Struct('>HBB')
+TIME_STRUCT = struct.Struct('>BBBI')
+TIMEDELTA_STRUCT = struct.Struct('>iiI')
+
+
+class RpcMsgpackEncoder(object):
+    """ Converts non-msgpack types to extension types.
+
+    Naive datetimes are passed as is, aware ones are converted to UTC.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            utc = o.tzinfo is not None
+            if utc:
+                o = o.astimezone(pytz.utc)
+            data = DATETIME_STRUCT.pack(o.year, o.month, o.day, o.hour,
+                                        o.minute, o.second, o.microsecond,
+                                        utc)
+            return msgpack.ExtType(EXT_DATETIME, data)
+        elif isinstance(o, datetime.date):
+            data = DATE_STRUCT.pack(o.year, o.month, o.day)
+            return msgpack.ExtType(EXT_DATE, data)
+        elif isinstance(o, datetime.time):
+            data = TIME_STRUCT.pack(o.hour, o.minute, o.second, o.microsecond)
+            return msgpack.ExtType(EXT_TIME, data)
+        elif isinstance(o, datetime.timedelta):
+            data = TIMEDELTA_STRUCT.pack(o.days, o.seconds, o.microseconds)
+            return msgpack.ExtType(EXT_TIMEDELTA, data)
+        elif isinstance(o, decimal.Decimal):
+            return msgpack.ExtType(EXT_DECIMAL, str(o).encode('ascii'))
+        elif isinstance(o, uuid.UUID):
+            return msgpack.ExtType(EXT_UUID, o.bytes)
+        elif has_django and is_expression(o):
+            data = x_rpc_msgpack_dumps(encode_expression(o))
+            return msgpack.ExtType(EXT_EXPRESSION, data)
+        elif has_django and isinstance(o, Promise):
+            return smart_str(o)
+        elif hasattr(o, 'tolist'):
+            return o.tolist()
+        elif hasattr(o, '__iter__'):
+            return [i for i in o]
+        raise TypeError("Can't serialize %r" % o)
+
+
+class RpcMsgpackDecoder(object):
+    """ Restores extension types; plain strings are never parsed."""
+
+    def ext_hook(self, code, data):
+        if code == EXT_DATETIME:
+            values = DATETIME_STRUCT.unpack(data)
+            tz = pytz.utc if values[-1] else None
+            return datetime.datetime(*values[:-1], tzinfo=tz)
+        if code == EXT_DATE:
+            return datetime.date(*DATE_STRUCT.unpack(data))
+        if code == EXT_TIME:
+            return datetime.time(*TIME_STRUCT.unpack(data))
+        if code == EXT_TIMEDELTA:
+            days, seconds, microseconds = TIMEDELTA_STRUCT.unpack(data)
+            return datetime.timedelta(days=days, seconds=seconds,
+                                      microseconds=microseconds)
+        if code == EXT_DECIMAL:
+            return decimal.Decimal(data.decode('ascii'))
+        if code == EXT_UUID:
+            return uuid.UUID(bytes=data)
+        if code == EXT_EXPRESSION:
+            return decode_expression(x_rpc_msgpack_loads(data))
+        return msgpack.ExtType(code, data)
+
+
+def x_rpc_msgpack_dumps(obj):
+    return msgpack.packb(obj, use_bin_type=True,
+                         default=RpcMsgpackEncoder().default)
+
+
+def x_rpc_msgpack_loads(s):
+    decoder = RpcMsgpackDecoder()
+    return msgpack.unpackb(s, raw=False, ext_hook=decoder.ext_hook)
+
+
+def msgpack_not_installed(*args, **kwargs):
+    raise SerializerNotInstalled(
+        'x-rpc-msgpack requires msgpack library, please install it')
+
+
+# first payload byte of compressed codecs
+PLAIN, COMPRESSED = b'\x00', b'\x01'
+
+
+def compressed(dumps, loads, compression, threshold):
+    """ Wraps codec functions with compression of large payloads.
+
+    :param threshold: min payload size in bytes to compress.
+    """
+    compress, decompress = COMPRESSORS[compression]
+
+    def compressed_dumps(obj):
+        data = dumps(obj)
+        if not isinstance(data, bytes_t):
+            data = data.encode('utf-8')
+        if len(data) < threshold:
+            return PLAIN + data
+        return COMPRESSED + compress(data)
+
+    def compressed_loads(s):
+        marker, data = s[:1], s[1:]
+        if marker == COMPRESSED:
+            data = decompress(data)
+        return loads(data)
+
+    return compressed_dumps, compressed_loads
+
+
+# serializer name -> (dumps, loads, content type, content encoding)
+CODECS = {
+    'x-rpc-json': (x_rpc_json_dumps, x_rpc_json_loads,
+                   'application/json+django-rpc-backend:v1', 'utf-8'),
+    'x-rpc-json2': (x_rpc_json2_dumps, x_rpc_json2_loads,
+                    'application/json+django-rpc-backend:v2', 'utf-8'),
+}
+
+# registered even without msgpack to keep accept content valid
+if msgpack is not None:
+    CODECS['x-rpc-msgpack'] = (
+        x_rpc_msgpack_dumps, x_rpc_msgpack_loads,
+        'application/x-msgpack+django-rpc-backend:v1', 'binary')
+else:
+    CODECS['x-rpc-msgpack'] = (
+        msgpack_not_installed, msgpack_not_installed,
+        'application/x-msgpack+django-rpc-backend:v1', 'binary')
+
+
+def register_compressed_codec(serializer, compression, threshold=None):
+    """ Registers compressed variant of rpc codec.
+
+    Name of codec contains threshold if it differs from default one.
+
+    :returns: registered codec name and content type.
+    """
+    from kombu.serialization import registry
+    if serializer not in CODECS:
+        raise ValueError("Compression is not supported for %s" % serializer)
+    if compression not in COMPRESSORS:
+        raise SerializerNotInstalled(
+            "%s compression is not available" % compression)
+    if threshold is None:
+        threshold = defaults.COMPRESSION_THRESHOLD
+    dumps, loads, content_type, _ = CODECS[serializer]
+    dumps, loads = compressed(dumps, loads, compression, threshold)
+    name = '%s+%s' % (serializer, compression)
+    if threshold != defaults.COMPRESSION_THRESHOLD:
+        name = '%s:%s' % (name, threshold)
+    content_type = '%s+%s' % (content_type, compression)
+    registry.register(name, dumps, loads, content_type, 'binary')
+    return name, content_type
+
+
 def register_codecs():
     from kombu.serialization import registry
-    registry.register('x-rpc-json', x_rpc_json_dumps, x_rpc_json_loads,
-                      'application/json+django-rpc-backend:v1', 'utf-8')
+    for name, (dumps, loads, content_type, encoding) in CODECS.items():
+        registry.register(name, dumps, loads, content_type, encoding)
+        # default compressed variants, i.e. x-rpc-json+zlib
+        for compression in COMPRESSORS:
+            register_compressed_codec(name, compression)
@@ -14,9 +14,25 @@ def _merge_dict(conf):
         default = getattr(defaults, k)
         result[k] = conf.get(k, default)
     result.update(conf)
+    if result.get('COMPRESSION'):
+        _configure_compression(result)
     return result
 
 
+def _configure_compression(conf):
+    """ Replaces celery serializers with compressed codec variants."""
+    from .codecs import register_compressed_codec
+
+    accept = list(conf['CELERY_ACCEPT_CONTENT'])
+    for key in ('CELERY_TASK_SERIALIZER', 'CELERY_RESULT_SERIALIZER'):
+        name, content_type = register_compressed_codec(
+            conf[key], conf['COMPRESSION'], conf['COMPRESSION_THRESHOLD'])
+        conf[key] = name
+        if content_type not in accept:
+            accept.append(content_type)
+    conf['CELERY_ACCEPT_CONTENT'] = accept
+
+
 class RpcSettings(object):
 
     def __init__(self, DATABASES=None):
@@ -0,0 +1,86 @@
+# coding: utf-8
+""" Fast parsing of ISO 8601 dates and datetimes returned by rpc server.
+
+Values have fixed layout ("2017-03-01", "2017-03-01T10:55:18[.055000]Z"),
+so they are parsed by slicing instead of strptime.
+"""
+import datetime
+
+import pytz
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+UTC = pytz.utc
+
+
+def parse_date(v):
+    return datetime.date(int(v[0:4]), int(v[5:7]), int(v[8:10]))
+
+
+def parse_datetime(v, tzinfo=UTC):
+    """ Parses "YYYY-MM-DDTHH:MM:SS[.ffffff][Z]" string.
+
+    :param tzinfo: timezone of value, UTC by default
+    """
+    microsecond = 0
+    if len(v) > 20 and v[19] == '.':
+        fraction = v[20:].rstrip('Z')
+        microsecond = int(fraction[:6].ljust(6, '0'))
+    return datetime.datetime(int(v[0:4]), int(v[5:7]), int(v[8:10]),
+                             int(v[11:13]), int(v[14:16]), int(v[17:19]),
+                             microsecond, tzinfo=tzinfo)
+
+
+def parse_dates(values):
+    """ Parses list of dates, decoded values are returned as is."""
+    date = datetime.date
+    return [v if isinstance(v, date) else parse_date(v) for v in values]
+
+
+def parse_datetimes(values, tzinfo=UTC):
+    """ Parses list of UTC datetimes and converts them to tzinfo.
+
+    Values already decoded by result codec are converted to tzinfo only.
+    """
+    dt_type = datetime.datetime
+    result = []
+    append = result.append
+    if tzinfo is UTC:
+        for v in values:
+            append(v.astimezone(UTC) if isinstance(v, dt_type)
+                   else parse_datetime(v))
+        return result
+    fromutc = tzinfo.fromutc
+    for v in values:
+        if isinstance(v, dt_type):
+            append(v.astimezone(tzinfo))
+        else:
+            # same as astimezone() for UTC value without extra conversions
+            append(fromutc(parse_datetime(v, tzinfo)))
+    return result
+
+
+def to_datetime64(values, dtype='datetime64[us]'):
+    """ Converts dates, datetimes or their string values to numpy array.
+
+    Aware datetimes are converted to UTC, None values become NaT.
+
+    :param dtype: datetime64 dtype, i.e. "datetime64[D]" for dates.
+    """
+    if numpy is None:
+        raise ImportError('datetime64 conversion requires numpy')
+    dt_type = datetime.datetime
+    converted = []
+    append = converted.append
+    for v in values:
+        if isinstance(v, dt_type):
+            if v.tzinfo is not None:
+                v = v.astimezone(UTC).replace(tzinfo=None)
+        elif v is not None and not isinstance(v, datetime.date):
+            # numpy parses ISO strings itself; "Z" suffix is deprecated
+            v = v.rstrip('Z')
+        append(v)
+    return numpy.array(converted, dtype=dtype)
@@ -6,6 +6,35 @@ ENGINE = 'django_rpc.backend.rpc'
 # Celery default settings
 BROKER_URL = 'amqp://localhost/'
 CELERY_RESULT_BACKEND = 'redis://localhost/'
-CELERY_ACCEPT_CONTENT = ['json', 'x-rpc-json']
+CELERY_ACCEPT_CONTENT = ['json', 'x-rpc-json', 'x-rpc-json2', 'x-rpc-msgpack',
+                         'x-rpc-json+zlib', 'x-rpc-json2+zlib',
+                         'x-rpc-msgpack+zlib']
+# Set to 'x-rpc-json2' for typed json encoding without string sniffing or
+# to 'x-rpc-msgpack' for binary encoding (requires msgpack library)
 CELERY_TASK_SERIALIZER = 'x-rpc-json'
 CELERY_RESULT_SERIALIZER = 'x-rpc-json'
+
+# Client-side fetch result cache size, 0 disables cache.
+# Results are cached only for models with Rpc.cache_ttl set.
+RESULT_CACHE_SIZE = 0
+
+# Worker-side cache size for generated serializer classes.
+SERIALIZER_CACHE_SIZE = 1000
+
+# Client-side cache size for model instance creation plans, one for each
+# model, result keys and only()/defer() options combination.
+INSTANCE_PLAN_CACHE_SIZE = 1000
+
+# Request fetch results in columns + rows format instead of list of dicts.
+# Requires rpc server supporting "columnar" fetch option.
+COLUMNAR_RESULTS = False
+
+# Max number of values in single "field__in" filter sent by in_bulk(), longer
+# lists are fetched with concurrent requests.
+IN_BULK_BATCH_SIZE = 500
+
+# Compress task arguments and results with 'zlib', 'lz4' or 'zstd' (the last
+# two require lz4 and zstandard libraries). Messages smaller than threshold
+# bytes are sent uncompressed.
+COMPRESSION = None
+COMPRESSION_THRESHOLD = 1024
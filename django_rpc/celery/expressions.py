@@ -0,0 +1,187 @@
+# coding: utf-8
+""" Structured encoding of Q objects and query expressions.
+
+Expression is encoded as ``[name, args, kwargs]`` node, where name is one of
+whitelisted django classes. Nested expressions are left as is in args and
+kwargs, so codecs encode them recursively with their own type tags, and
+decoded nodes receive already decoded children.
+"""
+from django.db import models
+from django.db.models import F, Q, Value, Func, Aggregate
+from django.db.models import functions
+from django.db.models.expressions import (
+    BaseExpression, Case, CombinedExpression, ExpressionWrapper, Star, When)
+
+try:
+    # django>=1.11
+    from django.db.models.expressions import OuterRef, Subquery
+except ImportError:
+    OuterRef = Subquery = None
+
+# aggregates and functions reconstructed from source expressions and extra
+FUNCTIONS = {cls.__name__: cls for cls in (
+    Func, Aggregate, models.Avg, models.Count, models.Max, models.Min,
+    models.StdDev, models.Sum, models.Variance)}
+# some functions are missing in older django versions
+for func_name in ('Cast', 'Coalesce', 'Concat', 'Greatest', 'Least', 'Length',
+                  'Lower', 'Now', 'Substr', 'Upper'):
+    if hasattr(functions, func_name):
+        FUNCTIONS[func_name] = getattr(functions, func_name)
+
+# aggregates passing output_field to parent constructor themselves
+FIXED_OUTPUT = (models.Count, models.StdDev, models.Variance)
+
+# aggregates with sample variants
+SAMPLE_FUNCTIONS = (models.StdDev, models.Variance)
+
+
+def is_expression(o):
+    return isinstance(o, (Q, F, BaseExpression))
+
+
+def encode_field(field):
+    """ Encodes output_field as [class name, kwargs] pair."""
+    if field is None:
+        return None
+    name, path, args, kwargs = field.deconstruct()
+    cls_name = path.rsplit('.', 1)[-1]
+    if getattr(models, cls_name, None) is not type(field) or args:
+        raise TypeError("Can't encode output field %r" % field)
+    return [cls_name, kwargs]
+
+
+def decode_field(value):
+    if value is None:
+        return None
+    cls_name, kwargs = value
+    cls = getattr(models, cls_name, None)
+    if not isinstance(cls, type) or not issubclass(cls, models.Field):
+        raise ValueError("Unknown output field %s" % cls_name)
+    return cls(**kwargs)
+
+
+def get_output_field(o):
+    """ Returns output field passed to expression constructor."""
+    # django-1.11 stores it as _output_field, newer versions as output_field
+    for attr in ('_output_field', 'output_field'):
+        field = o.__dict__.get(attr)
+        if field is not None:
+            return field
+    return None
+
+
+def encode_expression(o):
+    """ Returns [name, args, kwargs] node for Q object or expression.
+
+    :raises TypeError: for expressions not supported by rpc.
+    """
+    cls = type(o)
+    if cls is Q:
+        children = [c if isinstance(c, Q) else {c[0]: c[1]}
+                    for c in o.children]
+        return ['Q', children, {'connector': o.connector,
+                                'negated': o.negated}]
+    if cls in (F, OuterRef):
+        return [cls.__name__, [o.name], {}]
+    if cls is Star:
+        return ['Star', [], {}]
+    if cls is Value:
+        return ['Value', [], {'value': o.value,
+                              'output_field': encode_field(
+                                  get_output_field(o))}]
+    if cls is CombinedExpression:
+        return ['CombinedExpression', [o.lhs, o.connector, o.rhs],
+                {'output_field': encode_field(get_output_field(o))}]
+    if cls is ExpressionWrapper:
+        return ['ExpressionWrapper', [o.expression],
+                {'output_field': encode_field(get_output_field(o))}]
+    if cls is When:
+        return ['When', [o.condition, o.result], {}]
+    if cls is Case:
+        return ['Case', o.cases, {
+            'default': o.default,
+            'output_field': encode_field(get_output_field(o))}]
+    if cls is Subquery:
+        qs = o.queryset
+        opts = qs.model.Rpc
+        kwargs = dict(o.extra)
+        kwargs['output_field'] = encode_field(get_output_field(o))
+        return ['Subquery', [opts.app_label, opts.name, qs.rpc_trace],
+                kwargs]
+    if FUNCTIONS.get(cls.__name__) is cls:
+        return encode_function(o)
+    raise TypeError("Can't encode expression %r" % o)
+
+
+def encode_function(o):
+    args = o.get_source_expressions()
+    if isinstance(o, functions.Concat):
+        # unwrap ConcatPair chain built by constructor
+        pair, args = args[0], []
+        while isinstance(pair, functions.ConcatPair):
+            left, pair = pair.get_source_expressions()
+            args.append(left)
+        args.append(pair)
+    kwargs = dict(o.extra)
+    if isinstance(o, Aggregate):
+        distinct = kwargs.get('distinct') or getattr(o, 'distinct', False)
+        if distinct:
+            kwargs['distinct'] = True
+        else:
+            kwargs.pop('distinct', None)
+        if getattr(o, 'filter', None) is not None:
+            kwargs['filter'] = o.filter
+    if isinstance(o, SAMPLE_FUNCTIONS):
+        kwargs['sample'] = o.function.endswith('_SAMP')
+    if not isinstance(o, FIXED_OUTPUT):
+        field = get_output_field(o)
+        if field is not None:
+            kwargs['output_field'] = encode_field(field)
+    return [type(o).__name__, args, kwargs]
+
+
+def decode_expression(node):
+    """ Restores Q object or expression from [name, args, kwargs] node.
+
+    :raises ValueError: for unknown expression classes.
+    """
+    name, args, kwargs = node
+    if 'output_field' in kwargs:
+        kwargs['output_field'] = decode_field(kwargs['output_field'])
+    if name == 'Q':
+        q = Q()
+        q.connector = kwargs['connector']
+        q.negated = kwargs['negated']
+        q.children = [c if isinstance(c, Q) else tuple(c.items())[0]
+                      for c in args]
+        return q
+    if name == 'F':
+        return F(*args)
+    if name == 'OuterRef' and OuterRef is not None:
+        return OuterRef(*args)
+    if name == 'Star':
+        return Star()
+    if name == 'Value':
+        return Value(**kwargs)
+    if name == 'CombinedExpression':
+        return CombinedExpression(*args, **kwargs)
+    if name == 'ExpressionWrapper':
+        return ExpressionWrapper(*args, **kwargs)
+    if name == 'When':
+        return When(*args)
+    if name == 'Case':
+        return Case(*args, **kwargs)
+    if name == 'Subquery' and Subquery is not None:
+        return Subquery(decode_queryset(*args), **kwargs)
+    if name in FUNCTIONS:
+        return FUNCTIONS[name](*args, **kwargs)
+    raise ValueError("Unknown expression %s" % name)
+
+
+def decode_queryset(app_label, name, trace):
+    """ Builds server-side queryset for subquery."""
+    from django.apps import apps
+    qs = apps.get_model(app_label, name).objects.get_queryset()
+    for method, args, kwargs in trace:
+        qs = getattr(qs, method)(*args, **kwargs)
+    return qs
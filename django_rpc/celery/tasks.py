@@ -1,21 +1,92 @@
 # coding: utf-8
+import base64
 
 import celery
+from celery import signals
 from django.apps.registry import apps
 from django.core.exceptions import FieldDoesNotExist
-from django.db.models import QuerySet, Model
-from rest_framework import serializers
+from django.db import connections, router, transaction
+from django.db.models import Case, F, Model, QuerySet, Value, When
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
+from django_rpc.celery import codecs, defaults
 from django_rpc.celery.app import celery as celery_app
+from django_rpc.celery.cache import LRUCache
 from django_rpc.models.compat import DJ110
 
 
+# field serialization kinds, see BaseRpcTask.get_field_info
+DEFAULT, READONLY, NESTED = 'default', 'readonly', 'nested'
+
+# model field types which values are serialized as is
+PLAIN_FIELD_TYPES = {
+    'AutoField', 'BigAutoField', 'IntegerField', 'BigIntegerField',
+    'SmallIntegerField', 'PositiveIntegerField', 'PositiveSmallIntegerField',
+    'BooleanField', 'NullBooleanField', 'CharField', 'TextField',
+    'SlugField', 'EmailField', 'URLField', 'FloatField'}
+
+# model field types which values are passed as is to typed result codecs
+TYPED_FIELD_TYPES = {'DateTimeField', 'DateField', 'TimeField', 'DecimalField'}
+
+
+def datetime_converter(field):
+    """ Returns fast equivalent of DateTimeField.to_representation.
+
+    Timezone conversion is skipped for values already in field timezone.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    tz = getattr(field, 'timezone', field.default_timezone())
+    if (tz is None or output_format is None or
+            output_format.lower() != ISO_8601):
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is not tz:
+            value = field.enforce_timezone(value)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return convert
+
+
+class TypedModelSerializer(serializers.ModelSerializer):
+    """ Leaves date, time and decimal values in python representation."""
+
+    def build_standard_field(self, field_name, model_field):
+        field_class, field_kwargs = super(
+            TypedModelSerializer, self).build_standard_field(
+            field_name, model_field)
+        if issubclass(field_class, (serializers.DateTimeField,
+                                    serializers.DateField,
+                                    serializers.TimeField)):
+            field_kwargs['format'] = None
+        elif issubclass(field_class, serializers.DecimalField):
+            field_kwargs['coerce_to_string'] = False
+        return field_class, field_kwargs
+
+
 class BaseRpcTask(celery_app.Task):
     abstract = True
 
+    # result codec keeps date, time and decimal types
+    typed_results = codecs.is_typed_codec(
+        celery_app.conf.get('CELERY_RESULT_SERIALIZER'))
+
+    # generated serializer classes, shared by all tasks
+    serializer_cache = LRUCache(celery_app.conf.get(
+        'SERIALIZER_CACHE_SIZE', defaults.SERIALIZER_CACHE_SIZE))
+    # per-model field metadata
+    field_info_cache = {}
+    model_fields_cache = {}
+
     def serialize(self, qs, **kwargs):
 
         extra = kwargs.get('extra_fields', ())
+        nested = kwargs.get('nested')
 
         model = kwargs.get('model') or qs.model
         fields = kwargs.get('fields', '__all__')
@@ -24,54 +95,209 @@ class BaseRpcTask(celery_app.Task):
             # fix related objects attribute names
             fields = self.get_fields(model)
 
-        serializer_class = self.get_serializer_class(model, fields, extra)
+        serializer_class = self.get_serializer_class(model, fields, extra,
+                                                     nested)
+
+        many = kwargs.get('many', isinstance(qs, QuerySet))
+        return serializer_class(instance=qs, many=many).data
+
+    def get_flat_converters(self, model, fields):
+        """ Checks whether fields may be serialized without DRF serializer.
+
+        :returns: list of per-column converters (None for values passed
+            as is) for flat projections of concrete fields, None if nested
+            relations or non-model fields are requested.
+        """
+        serializer_fields = None
+        converters = []
+        for name in fields:
+            kind, f, many = self.get_field_info(model, name)
+            if kind == NESTED or f is None:
+                return None
+            internal_type = f.get_internal_type()
+            if (kind == READONLY or internal_type in PLAIN_FIELD_TYPES or
+                    self.typed_results and internal_type in TYPED_FIELD_TYPES):
+                converters.append(None)
+                continue
+            if serializer_fields is None:
+                serializer_class = self.get_serializer_class(model, fields)
+                serializer_fields = serializer_class().fields
+            # same representation as DRF serializer returns
+            serializer_field = serializer_fields[name]
+            if isinstance(serializer_field, serializers.DateTimeField):
+                converters.append(datetime_converter(serializer_field))
+            else:
+                converters.append(serializer_field.to_representation)
+        return converters
 
-        return serializer_class(instance=qs, many=isinstance(qs, QuerySet)).data
+    @staticmethod
+    def serialize_flat(qs, fields, converters, columnar=False):
+        """ Serializes flat projection using values_list()."""
+        columns = [(i, c) for i, c in enumerate(converters) if c is not None]
+        rows = []
+        for row in qs.values_list(*fields):
+            if columns:
+                row = list(row)
+                for i, convert in columns:
+                    value = row[i]
+                    if value is not None:
+                        row[i] = convert(value)
+            rows.append(row)
+        if columnar:
+            return {'columns': list(fields), 'rows': rows}
+        return [dict(zip(fields, row)) for row in rows]
 
-    def get_serializer_class(self, model, fields=None, extra_fields=()):
-        fields = fields or self.get_fields(model)
+    @staticmethod
+    def to_columnar(rows):
+        """ Converts list of dicts to columns + rows representation.
+
+        Other results are sent as "rows" with None "columns", so client
+        requesting columnar format never guesses it from result shape.
+        """
+        if (not isinstance(rows, list) or not rows or
+                not isinstance(rows[0], dict)):
+            return {'columns': None, 'rows': rows}
+        columns = list(rows[0].keys())
+        return {'columns': columns,
+                'rows': [[row[c] for c in columns] for row in rows]}
+
+    def get_serializer_class(self, model, fields=None, extra_fields=(),
+                             nested=None):
+        """
+        :param nested: dict of field lists for nested serializers of
+            related objects, all fields are serialized for missing ones.
+        """
+        fields = tuple(fields or self.get_fields(model))
+        nested = nested or {}
+        key = (model, fields, tuple(sorted(set(extra_fields))),
+               tuple(sorted(nested.items())), self.typed_results)
+        serializer_class = self.serializer_cache.get(key)
+        if serializer_class is None:
+            serializer_class = self.build_serializer_class(
+                model, fields, extra_fields, nested)
+            self.serializer_cache.set(key, serializer_class)
+        return serializer_class
+
+    def build_serializer_class(self, model, fields, extra_fields=(),
+                               nested=None):
+        nested = nested or {}
         # noinspection PyPep8Naming
-        Meta = type('Meta', (), {'model': model, 'fields': fields})
+        Meta = type('Meta', (), {'model': model, 'fields': list(fields)})
         attrs = {'Meta': Meta}
+        for k in set(fields) | set(extra_fields):
+            kind, f, many = self.get_field_info(model, k)
+            if kind == READONLY:
+                attrs[k] = serializers.ReadOnlyField()
+            elif kind == NESTED:
+                related_model = f.model if many else f.related_model
+
+                # noinspection PyPep8Naming
+                NestedSerializer = self.get_serializer_class(
+                    related_model, nested.get(k))
+                attrs[k] = NestedSerializer(many=many,
+                                            required=not f.blank,
+                                            allow_null=f.null)
+        base = (TypedModelSerializer if self.typed_results
+                else serializers.ModelSerializer)
+        serializer_class = type("Serializer", (base,), attrs)
+        return serializer_class
+
+    @classmethod
+    def get_field_info(cls, model, name):
+        """ Resolves how model attribute must be serialized.
+
+        :returns: (kind, field, many) tuple, where kind is one of DEFAULT,
+            READONLY or NESTED.
+        """
+        key = model, name
+        try:
+            return cls.field_info_cache[key]
+        except KeyError:
+            pass
         # noinspection PyProtectedMember
         opts = model._meta
-        for k in set(fields) | set(extra_fields):
+        try:
+            descriptor = getattr(model, name)
             try:
-                descriptor = getattr(model, k)
-                try:
-                    f = descriptor.field
-                except AttributeError:
-                    f = descriptor.related.field
+                f = descriptor.field
             except AttributeError:
-                try:
-                    f = opts.get_field(k)
-                    if f.name != k:
-                        attrs[k] = serializers.ReadOnlyField()
-                except FieldDoesNotExist:
-                    attrs[k] = serializers.ReadOnlyField()
+                f = descriptor.related.field
+        except AttributeError:
+            try:
+                f = opts.get_field(name)
+                info = (READONLY if f.name != name else DEFAULT), f, False
+            except FieldDoesNotExist:
+                info = READONLY, None, False
+        else:
+            if not f.is_relation:
+                info = READONLY, f, False
             else:
-                if not f.is_relation:
-                    attrs[k] = serializers.ReadOnlyField()
-                else:
-                    many = hasattr(descriptor, 'related_manager_cls')
-                    model = f.model if many else f.related_model
-                    fields = self.get_fields(model)
-
-                    # noinspection PyPep8Naming
-                    NestedSerializer = self.get_serializer_class(model, fields)
-                    nested = NestedSerializer(many=many,
-                                              required=not f.blank,
-                                              allow_null=f.null)
-                    attrs[k] = nested
-        serializer_class = type("Serializer",
-                                (serializers.ModelSerializer,),
-                                attrs)
-        return serializer_class
+                many = hasattr(descriptor, 'related_manager_cls')
+                info = NESTED, f, many
+        cls.field_info_cache[key] = info
+        return info
 
     @staticmethod
-    def get_fields(model):
-        # noinspection PyProtectedMember
-        return [f.attname for f in model._meta.fields]
+    def split_nested(names):
+        """ Separates "relation__field" names from model field names.
+
+        :returns: (field names, {relation: [related field names]}) pair.
+        """
+        fields, nested = [], {}
+        for name in names:
+            if LOOKUP_SEP in name:
+                relation, name = name.split(LOOKUP_SEP, 1)
+                nested.setdefault(relation, []).append(name)
+            else:
+                fields.append(name)
+        return fields, nested
+
+    def get_nested_fields(self, model, extra_fields, only, defer):
+        """ Returns field lists for nested serializers of related objects.
+
+        :param extra_fields: model attributes serialized with nested serializer
+        :param only: {relation: [field names]} passed to qs.only()
+        :param defer: {relation: [field names]} passed to qs.defer()
+        """
+        nested = {}
+        for name in extra_fields:
+            if name not in only and name not in defer:
+                continue
+            kind, f, many = self.get_field_info(model, name)
+            if kind != NESTED:
+                continue
+            related_model = f.model if many else f.related_model
+            fields = only.get(name) or self.get_fields(related_model)
+            # noinspection PyProtectedMember
+            pk_name = related_model._meta.pk.attname
+            if pk_name not in fields:
+                fields = fields + [pk_name]
+            # deeper relations are not serialized by nested serializers
+            nested[name] = tuple(n for n in fields
+                                 if n not in defer.get(name, ()) and
+                                 LOOKUP_SEP not in n)
+        return nested
+
+    @classmethod
+    def get_fields(cls, model):
+        try:
+            fields = cls.model_fields_cache[model]
+        except KeyError:
+            # noinspection PyProtectedMember
+            fields = [f.attname for f in model._meta.fields]
+            cls.model_fields_cache[model] = fields
+        return list(fields)
+
+    @staticmethod
+    def encode_cursor(field, obj):
+        """ Encodes last seen key value to opaque continuation token."""
+        value = field.value_to_string(obj)
+        return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(field, token):
+        value = base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8')
+        return field.to_python(value)
 
     @staticmethod
     def trace_queryset(qs, trace):
@@ -87,13 +313,19 @@ class FetchTask(BaseRpcTask):
 
     def run(self, module_name, class_name, trace, fields=None,
             extra_fields=None, exclude_fields=None, native=False,
-            limits=(0, None)):
+            limits=(0, None), keyset=None, columnar=False, with_total=False):
+        """
+        :param with_total: return dict with "results" and "total" count of
+            rows matching queryset without limits.
+        """
         model = apps.get_model(module_name, class_name)
         qs = model.objects.get_queryset()
 
-        exclude_fields = list(exclude_fields or ())
         extra_fields = list(extra_fields or ())
-        fields = list(fields or [])
+        # "relation__field" names restrict nested serializer fields
+        fields, only = self.split_nested(fields or ())
+        exclude_fields, defer = self.split_nested(exclude_fields or ())
+        nested = self.get_nested_fields(model, extra_fields, only, defer)
 
         if extra_fields or exclude_fields or not fields:
             fields = self.get_fields(model)
@@ -102,16 +334,86 @@ class FetchTask(BaseRpcTask):
                   if f not in exclude_fields] or '__all__'
 
         qs = self.trace_queryset(qs, trace)
-        if native:
-            if isinstance(qs, QuerySet):
-                return list(qs)
-            return qs
-
-        if tuple(limits) != (0, None):
+        if keyset:
+            assert not native, "keyset pagination for native results"
+            page = self.fetch_page(qs, keyset, model=model, fields=fields,
+                                   extra_fields=extra_fields, nested=nested)
+            if columnar:
+                page['results'] = self.to_columnar(page['results'])
+            return page
+
+        results = self.fetch_results(qs, model, fields, extra_fields, nested,
+                                     native, limits, columnar)
+        if with_total:
+            total = qs.count() if isinstance(qs, QuerySet) else None
+            return {'results': results, 'total': total}
+        return results
+
+    def fetch_results(self, qs, model, fields, extra_fields, nested, native,
+                      limits, columnar):
+        """ Slices queryset and returns serialized results."""
+        if tuple(limits) != (0, None) and isinstance(qs, QuerySet):
             start, stop = limits
             qs = qs[slice(start, stop)]
-        return self.serialize(qs, model=model, fields=fields,
-                              extra_fields=extra_fields)
+
+        if not isinstance(qs, QuerySet):
+            if native:
+                result = qs
+            else:
+                result = self.serialize(qs, model=model, fields=fields,
+                                        extra_fields=extra_fields,
+                                        nested=nested)
+        elif native:
+            result = list(qs)
+        else:
+            converters = None
+            if fields != '__all__' and not extra_fields:
+                converters = self.get_flat_converters(model, fields)
+            if converters is not None:
+                return self.serialize_flat(qs, fields, converters,
+                                           columnar=columnar)
+            result = self.serialize(qs, model=model, fields=fields,
+                                    extra_fields=extra_fields, nested=nested)
+        return self.to_columnar(result) if columnar else result
+
+    def fetch_page(self, qs, keyset, **kwargs):
+        """ Fetches page ordered by unique field using index seek.
+
+        :param keyset: (field, token, size) triple; field may be prefixed
+            with '-' for descending order, token is returned by previous page.
+        :returns: dict with serialized page "results" and "next" page token.
+        """
+        ordering, token, size = keyset
+        name = ordering.lstrip('-')
+        # noinspection PyProtectedMember
+        opts = qs.model._meta
+        field = opts.pk if name == 'pk' else opts.get_field(name)
+        qs = qs.order_by(ordering)
+        if token is not None:
+            lookup = 'lt' if ordering.startswith('-') else 'gt'
+            value = self.decode_cursor(field, token)
+            qs = qs.filter(**{'%s__%s' % (name, lookup): value})
+        objects = list(qs[:size])
+        next_token = None
+        if len(objects) == size:
+            next_token = self.encode_cursor(field, objects[-1])
+        results = self.serialize(objects, many=True, **kwargs)
+        return {'results': results, 'next': next_token}
+
+
+class BatchTask(FetchTask):
+    name = 'django_rpc.batch'
+
+    # noinspection PyMethodOverriding
+    def run(self, specs):
+        """ Performs multiple fetches in single task.
+
+        :param specs: list of (args, kwargs) pairs for FetchTask.run
+        """
+        results = []
+        for args, kwargs in specs:
+            results.append(super(BatchTask, self).run(*args, **kwargs))
+        return results
 
 
 class InsertTask(BaseRpcTask):
@@ -127,13 +429,21 @@ class InsertTask(BaseRpcTask):
         data = rpc_data if many else rpc_data[0]
         s = serializer_class(data=data, many=many)
         s.is_valid(raise_exception=True)
+        # primary key is read-only for serializer, but is kept when set
+        # noinspection PyProtectedMember
+        pk_name = model._meta.pk.attname
+        pks = [item.get(pk_name) for item in rpc_data]
 
         if many:
             objects = [model(**item) for item in s.validated_data]
+            for obj, pk in zip(objects, pks):
+                if pk is not None:
+                    obj.pk = pk
             model.objects.bulk_create(objects)
             s = serializer_class(instance=objects, many=True)
         else:
-            result = s.save()
+            kwargs = {pk_name: pks[0]} if pks[0] is not None else {}
+            result = s.save(**kwargs)
             if return_id:
                 return result.pk
         return s.data if many else [s.data]
@@ -142,7 +452,13 @@ class InsertTask(BaseRpcTask):
 class UpdateTask(BaseRpcTask):
     name = 'django_rpc.update'
 
-    def run(self, module_name, class_name, trace, updates, single=False):
+    def run(self, module_name, class_name, trace, updates, single=False,
+            missing_ok=False):
+        """
+        :param single: update single row with Model.save()
+        :param missing_ok: return 0 for missing single row instead of
+            raising DoesNotExist; Django model save() inserts it then.
+        """
         model = apps.get_model(module_name, class_name)
         # noinspection PyProtectedMember
         pk_name = model._meta.pk.attname
@@ -150,7 +466,12 @@ class UpdateTask(BaseRpcTask):
         qs = model.objects.get_queryset()
         qs = self.trace_queryset(qs, trace)
         if single:
-            instance = qs.get()
+            try:
+                instance = qs.get()
+            except model.DoesNotExist:
+                if not missing_ok:
+                    raise
+                return 0
             for k, v in updates.items():
                 setattr(instance, k, v)
             instance.save(update_fields=list(updates.keys()))
@@ -158,6 +479,50 @@ class UpdateTask(BaseRpcTask):
         return qs.update(**updates)
 
 
+class BulkUpdateTask(BaseRpcTask):
+    name = 'django_rpc.bulk_update'
+
+    def run(self, module_name, class_name, fields, rows):
+        """ Sets different fields values for rows in single transaction.
+
+        Rows are updated with UPDATE ... SET field = CASE pk WHEN ... queries
+        split to batches supported by database backend.
+
+        :param fields: names of updated fields
+        :param rows: lists of primary key and fields values
+        :returns: count of updated rows
+        """
+        model = apps.get_model(module_name, class_name)
+        # noinspection PyProtectedMember
+        opts = model._meta
+        fields = [opts.get_field(name) for name in fields]
+        # same checks as in QuerySet.bulk_update() of django>=2.2
+        if any(not f.concrete or f.many_to_many for f in fields):
+            raise ValueError('bulk_update() can only be used with concrete '
+                             'fields.')
+        if any(f.primary_key for f in fields):
+            raise ValueError('bulk_update() cannot be used with primary key '
+                             'fields.')
+        qs = model.objects.get_queryset()
+        db = router.db_for_write(model)
+        batch_size = connections[db].ops.bulk_batch_size(
+            ['pk', 'pk'] + fields, rows) or 1
+        updated = 0
+        with transaction.atomic(using=db, savepoint=False):
+            for offset in range(0, len(rows), batch_size):
+                batch = rows[offset:offset + batch_size]
+                updates = {}
+                for i, field in enumerate(fields, 1):
+                    whens = [When(pk=row[0],
+                                  then=Value(row[i], output_field=field))
+                             for row in batch]
+                    updates[field.attname] = Case(
+                        *whens, default=F(field.attname), output_field=field)
+                pks = [row[0] for row in batch]
+                updated += qs.filter(pk__in=pks).update(**updates)
+        return updated
+
+
 class DeleteTask(BaseRpcTask):
     name = 'django_rpc.delete'
 
@@ -189,10 +554,21 @@ if celery.VERSION >= (4, 0, 0):
     insert = celery_app.register_task(InsertTask())
     update = celery_app.register_task(UpdateTask())
     delete = celery_app.register_task(DeleteTask())
+    bulk_update = celery_app.register_task(BulkUpdateTask())
     get_or_create = celery_app.register_task(GetOrCreateTask())
+    batch = celery_app.register_task(BatchTask())
 else:
     fetch = FetchTask()
     insert = InsertTask()
     update = UpdateTask()
     delete = DeleteTask()
+    bulk_update = BulkUpdateTask()
     get_or_create = GetOrCreateTask()
+    batch = BatchTask()
+
+
+@signals.worker_init.connect
+def warm_serializer_cache(**kwargs):
+    """ Builds default serializers for all models at worker start."""
+    for model in apps.get_models()[:BaseRpcTask.serializer_cache.maxsize]:
+        fetch.get_serializer_class(model)
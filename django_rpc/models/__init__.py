@@ -2,13 +2,17 @@
 
 try:
     from .django import *
+    from .paginator import RpcPaginator
 
-    __all__ = list(django.__all__)
+    __all__ = list(django.__all__) + ['RpcPaginator']
 except ImportError:
     __all__ = []
 
 from .base import RpcModel
 from .query import RpcQuerySet
 from .manager import RpcManager
+from .future import RpcFuture, gather, fetch_many
+from .session import session
 
-__all__.extend(['RpcModel', 'RpcManager', 'RpcQuerySet'])
+__all__.extend(['RpcModel', 'RpcManager', 'RpcQuerySet', 'RpcFuture',
+                'gather', 'fetch_many', 'session'])
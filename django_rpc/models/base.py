@@ -2,6 +2,7 @@
 import six
 
 from django_rpc.celery.client import RpcClient
+from django_rpc.models import utils
 from django_rpc.models.manager import RpcManager
 
 S_MUST_DEFINE_NON_EMPTY_ATTR = "%s.Rpc class must define non-empty %s attribute"
@@ -52,7 +53,7 @@ class RpcModelBase(type):
         assert rpc is not None, S_MUST_DEFINE_RPC_CLASS % name
 
         base_rpc = bases[0].Rpc
-        for attr in 'db', 'pk_field':
+        for attr in 'db', 'pk_field', 'cache_ttl':
             if not hasattr(rpc, attr):
                 setattr(rpc, attr, getattr(base_rpc, attr))
 
@@ -70,6 +71,8 @@ class RpcModel(six.with_metaclass(RpcModelBase)):
         app_label = None
         name = None
         pk_field = 'id'
+        # seconds to keep fetch results in client cache, None disables cache
+        cache_ttl = None
 
     def save(self, force_insert=False, force_update=False, update_fields=None):
         if update_fields:
@@ -86,7 +89,17 @@ class RpcModel(six.with_metaclass(RpcModelBase)):
             data = {k: v for k, v in self.__dict__.items()
                     if k in update_fields}
         else:
-            data = self.__dict__.copy()
+            # skip related objects and sibling caches
+            data = {k: v for k, v in self.__dict__.items()
+                    if not k.startswith('_')}
+            if not force_insert:
+                changed = utils.get_changed_fields(self, data,
+                                                   self.Rpc.pk_field)
+                if changed is not None:
+                    data = {k: data[k] for k in changed}
+                    if not data:
+                        # nothing changed since instance was fetched
+                        return 0
 
         if force_insert:
             obj = self.__class__.objects.create(**data)
@@ -97,6 +110,7 @@ class RpcModel(six.with_metaclass(RpcModelBase)):
             qs = self.__class__.objects.filter(pk=pk)
             result = client.update(opts.app_label, opts.name, qs.rpc_trace,
                                    data, single=True)
+            utils.update_state(self, data)
             return result
 
     def delete(self):
@@ -104,3 +118,9 @@ class RpcModel(six.with_metaclass(RpcModelBase)):
         assert pk is not None, "delete non-existing object"
 
         self.__class__.objects.filter(pk=pk).delete()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # don't pickle other objects from same queryset result
+        state.pop('_rpc_siblings', None)
+        return state
@@ -0,0 +1,58 @@
+# coding: utf-8
+""" Conversion of columnar fetch results for analytics."""
+from datetime import date, datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from django_rpc.celery import dates
+from django_rpc.celery.codecs import is_columnar
+
+
+def get_columns(result, names=()):
+    """ Returns dict of column values lists for fetch result.
+
+    :param names: column names for empty results
+    """
+    if not is_columnar(result):
+        # empty results are not converted to columnar format
+        assert not result, "columnar result expected"
+        return {name: [] for name in names}
+    columns = result['columns']
+    rows = result.get_rows()
+    values = zip(*rows) if rows else [()] * len(columns)
+    return {name: list(v) for name, v in zip(columns, values)}
+
+
+def get_dtype(values):
+    """ Returns datetime64 dtype for columns of dates and datetimes."""
+    for v in values:
+        if v is None:
+            continue
+        if isinstance(v, datetime):
+            return 'datetime64[us]'
+        if isinstance(v, date):
+            return 'datetime64[D]'
+        return None
+    return None
+
+
+def to_arrays(columns, dtypes=None):
+    """ Converts dict of column lists to dict of numpy arrays.
+
+    :param dtypes: numpy dtypes for columns, datetime and date columns are
+        converted to datetime64 by default; None values are NaT for them.
+    """
+    if numpy is None:
+        raise ImportError('to_arrays() requires numpy, please install it')
+    dtypes = dtypes or {}
+    arrays = {}
+    for name, values in columns.items():
+        dtype = dtypes.get(name) or get_dtype(values)
+        if dtype is not None and numpy.dtype(dtype).kind == 'M':
+            arrays[name] = dates.to_datetime64(values, dtype)
+        else:
+            arrays[name] = numpy.array(values, dtype=dtype)
+    return arrays
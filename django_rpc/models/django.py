@@ -2,13 +2,15 @@
 
 from __future__ import absolute_import
 
+import functools
+
 import six
 from django.conf import settings
 from django.db import models, router
 
 from django_rpc.celery import defaults
 from django_rpc.celery.client import RpcClient
-from django_rpc.models import base
+from django_rpc.models import base, utils
 from django_rpc.models.compat import DJ110
 from django_rpc.models.query import RpcQuerySet
 
@@ -51,6 +53,7 @@ class DjangoRpcModelBase(base.RpcModelBase, models.base.ModelBase):
 
 
 class DjangoRpcQuerySet(RpcQuerySet, models.QuerySet):
+    _defer_missing = False
 
     def __init__(self, model=None, query=None, using=None, hints=None):
         RpcQuerySet.__init__(self, model)
@@ -59,40 +62,67 @@ class DjangoRpcQuerySet(RpcQuerySet, models.QuerySet):
                                  hints=hints)
         self._iterable_class = RpcQuerySet._iterable_class
 
-    def update_model(self, obj, data):
-        patched = {}
-        cache = {}
-        if self._prefetch_fields:
-            obj._prefetched_objects_cache = cache
-        for k, v in data.items():
+    def _get_setter(self, name):
+        try:
+            descriptor = getattr(self.model, name)
             try:
-                descriptor = getattr(self.model, k)
-                try:
-                    f = descriptor.field
-                except AttributeError:
-                    f = descriptor.related.field
-                if not f.is_relation:
-                    patched[k] = v
-                elif hasattr(descriptor, 'related_manager_cls'):
-                    manager = descriptor.related_manager_cls(obj)
-                    qs = manager.get_queryset()
-                    qs._result_cache = [qs.instantiate(i) for i in v]
-                    cache[f.rel.related_query_name] = qs
-                else:
-                    cache_name = f.get_cache_name()
-                    qs = f.related_model.objects.get_queryset()
-                    related_obj = qs.instantiate(v)
-                    patched[cache_name] = related_obj
+                f = descriptor.field
             except AttributeError:
-                patched[k] = v
+                f = descriptor.related.field
+        except AttributeError:
+            return super(DjangoRpcQuerySet, self)._get_setter(name)
+        if not f.is_relation:
+            return super(DjangoRpcQuerySet, self)._get_setter(name)
+        if hasattr(descriptor, 'related_manager_cls'):
+            return functools.partial(
+                self._set_reverse, descriptor, f.rel.related_query_name,
+                bool(self._prefetch_fields))
+        qs = f.related_model.objects.get_queryset()
+        # fields missing in data are deferred by only('fk__name') or
+        # defer('fk__name'), defaults set by model constructor are removed
+        qs._defer_missing = True
+        return functools.partial(self._set_related, qs, name,
+                                 f.get_cache_name())
+
+    @staticmethod
+    def _set_related(qs, name, cache_name, obj, value):
+        if value is None:
+            setattr(obj, name, None)
+        else:
+            obj.__dict__[cache_name] = qs.instantiate(value)
 
-        super(DjangoRpcQuerySet, self).update_model(obj, patched)
+    @staticmethod
+    def _set_reverse(descriptor, cache_key, prefetch, obj, value):
+        manager = descriptor.related_manager_cls(obj)
+        qs = manager.get_queryset()
+        qs._defer_missing = True
+        qs._result_cache = [qs.instantiate(i) for i in value]
+        if prefetch:
+            cache = obj.__dict__.setdefault('_prefetched_objects_cache', {})
+            cache[cache_key] = qs
+
+    def _get_plan_options(self):
+        options = super(DjangoRpcQuerySet, self)._get_plan_options()
+        return options + (self._defer_missing, bool(self._prefetch_fields))
+
+    def _build_plan(self, keys):
+        plan = super(DjangoRpcQuerySet, self)._build_plan(keys)
+        if self._defer_missing:
+            # noinspection PyProtectedMember
+            missing = {f.attname for f in self.model._meta.fields
+                       if f.attname not in keys}
+            plan.exclude = plan.exclude | missing
+        return plan
 
     @staticmethod
     def _get_fields(obj):
         # noinspection PyProtectedMember
         return [f.attname for f in obj._meta.fields]
 
+    def _get_attname(self, name):
+        # noinspection PyProtectedMember
+        return self.model._meta.get_field(name).attname
+
     def _get_pk_field(self):
         # noinspection PyProtectedMember
         return self.model._meta.pk.attname
@@ -115,8 +145,9 @@ class DjangoRpcQuerySet(RpcQuerySet, models.QuerySet):
             if t.method == 'filter' and tuple(t.kwargs.keys()) == ('pk',):
                 single_pk = True
                 break
+        # Model.save() inserts row when nothing is updated
         return client.update(rpc.app_label, rpc.name, self.rpc_trace, values,
-                             single=single_pk)
+                             single=single_pk, missing_ok=single_pk)
 
     def get_or_create(self, *args, **kwargs):
         return self._get_or_update_or_create(args, kwargs, update=False)
@@ -153,6 +184,29 @@ class DjangoRpcModel(six.with_metaclass(DjangoRpcModelBase,
 
     objects = DjangoRpcManager()
 
-    save = models.Model.save
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        """ Saves only fields changed since instance was fetched."""
+        # noinspection PyProtectedMember
+        opts = self._meta
+        if update_fields is None and not force_insert:
+            fields = [f for f in opts.concrete_fields if not f.primary_key]
+            changed = utils.get_changed_fields(
+                self, [f.attname for f in fields], opts.pk.attname)
+            if changed is not None:
+                if not changed:
+                    return
+                # keep auto_now fields behavior of full save
+                changed.extend(f.attname for f in fields
+                               if getattr(f, 'auto_now', False) and
+                               f.attname not in changed)
+                update_fields = changed
+        models.Model.save(self, force_insert=force_insert,
+                          force_update=force_update, using=using,
+                          update_fields=update_fields)
+        if update_fields is None:
+            update_fields = [f.attname for f in opts.concrete_fields]
+        utils.update_state(self, [opts.get_field(name).attname
+                                  for name in update_fields])
 
     delete = models.Model.delete
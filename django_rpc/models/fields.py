@@ -8,18 +8,29 @@ class ForeignKey(object):
 
     def contribute_to_class(self, model, name):
         self.model = model
-        setattr(model, name, ForwardFKDescriptor(self.remote_model, name))
+        descriptor = ForwardFKDescriptor(self.remote_model, name)
+        setattr(model, name, descriptor)
+        model._rpc_fk_descriptors = getattr(
+            model, '_rpc_fk_descriptors', ()) + (descriptor,)
         model_name = model.Rpc.name.lower()
         descriptor_name = '%s_set' % model_name
         setattr(self.remote_model, descriptor_name,
-                ReverseFKDescriptor(model, model_name, self.remote_model))
+                ReverseFKDescriptor(model, model_name, self.remote_model,
+                                    descriptor))
 
 
 class ReverseFKDescriptor(object):
-    def __init__(self, model, name, remote_model):
+    def __init__(self, model, name, remote_model, forward):
+        """
+        :param model: model containing ForeignKey
+        :param name: related query name
+        :param remote_model: model referenced by ForeignKey
+        :param forward: ForwardFKDescriptor of ForeignKey
+        """
         self.model = model
         self.name = name
-        self.fk_name = remote_model.Rpc.pk_field
+        self.pk_name = remote_model.Rpc.pk_field
+        self.forward = forward
 
     def __get__(self, instance, owner):
         if not instance:
@@ -28,20 +39,41 @@ class ReverseFKDescriptor(object):
             # noinspection PyProtectedMember
             return instance._prefetched_objects_cache[self.name]
         except (AttributeError, KeyError):
-            return self.model.objects.filter(pk=getattr(instance, self.fk_name))
+            return self.get_queryset(getattr(instance, self.pk_name))
+
+    def get_queryset(self, pk):
+        return self.model.objects.filter(**{self.forward.fk_name: pk})
+
+    def load_related(self, instances):
+        """ Fills related objects cache for instances with single request.
+        """
+        pks = list({getattr(i, self.pk_name) for i in instances})
+        lookup = '%s__in' % self.forward.fk_name
+        groups = {}
+        for obj in self.model.objects.filter(**{lookup: pks}):
+            groups.setdefault(getattr(obj, self.forward.fk_name), []).append(
+                obj)
+        for instance in instances:
+            objects = groups.get(getattr(instance, self.pk_name), [])
+            for obj in objects:
+                setattr(obj, self.forward.cache_name, instance)
+            qs = self.get_queryset(getattr(instance, self.pk_name))
+            qs._result_cache = objects
+            self.get_cache(instance)[self.name] = qs
+
+    @staticmethod
+    def get_cache(instance):
+        if not hasattr(instance, '_prefetched_objects_cache'):
+            instance._prefetched_objects_cache = {}
+        return instance._prefetched_objects_cache
 
     def __set__(self, instance, value):
         raise NotImplementedError("Setting reverse descriptor not allowed")
 
     def set(self, instance, data):
         qs = self.model.objects.get_queryset()
-        if not hasattr(instance, '_prefetched_objects_cache'):
-            instance._prefetched_objects_cache = cache = {}
-        else:
-            cache = instance._prefetched_objects_cache
-
         qs._result_cache = [qs.instantiate(i) for i in data]
-        cache[self.name] = qs
+        self.get_cache(instance)[self.name] = qs
 
 
 class ForwardFKDescriptor(object):
@@ -50,20 +82,46 @@ class ForwardFKDescriptor(object):
         self.cache_name = '_%s_cache' % name
         self.model = model
         self.name = name
+        self._queryset = None
 
     def __get__(self, instance, owner):
         if not instance:
             return self
         try:
-            obj = getattr(instance, self.cache_name)
+            return getattr(instance, self.cache_name)
         except AttributeError:
-            fk = getattr(instance, self.fk_name, None)
-            if fk is None:
-                return None
-            obj = self.model.objects.get(pk=fk)
-            setattr(instance, self.cache_name, obj)
+            pass
+        fk = getattr(instance, self.fk_name, None)
+        if fk is None:
+            return None
+        siblings = getattr(instance, '_rpc_siblings', None)
+        if siblings:
+            self.load_related(siblings)
+            try:
+                return getattr(instance, self.cache_name)
+            except AttributeError:
+                # related object not found, raise DoesNotExist
+                pass
+        obj = self.model.objects.get(pk=fk)
+        setattr(instance, self.cache_name, obj)
         return obj
 
+    def load_related(self, instances):
+        """ Fills related object cache for instances with single request."""
+        pending = [i for i in instances
+                   if getattr(i, self.fk_name, None) is not None and
+                   not hasattr(i, self.cache_name)]
+        if not pending:
+            return
+        pks = list({getattr(i, self.fk_name) for i in pending})
+        pk_field = self.model.Rpc.pk_field
+        related = {getattr(obj, pk_field): obj
+                   for obj in self.model.objects.filter(pk__in=pks)}
+        for i in pending:
+            obj = related.get(getattr(i, self.fk_name))
+            if obj is not None:
+                setattr(i, self.cache_name, obj)
+
     def __set__(self, instance, value):
         setattr(instance, self.cache_name, value)
         if value is None:
@@ -73,5 +131,10 @@ class ForwardFKDescriptor(object):
         setattr(instance, self.fk_name, fk)
 
     def set(self, instance, data):
-        qs = self.model.objects.get_queryset()
-        self.__set__(instance, qs.instantiate(data))
+        if data is None:
+            self.__set__(instance, None)
+            return
+        if self._queryset is None:
+            # instantiate() does not depend on queryset state
+            self._queryset = self.model.objects.get_queryset()
+        self.__set__(instance, self._queryset.instantiate(data))
@@ -0,0 +1,74 @@
+# coding: utf-8
+from django_rpc.celery.client import RpcClient
+
+
+class RpcFuture(object):
+    """ Deferred result of rpc request.
+
+    Wraps celery AsyncResult; received data is passed through callback
+    (i.e. instantiated or stored to queryset result cache) only once.
+    """
+
+    def __init__(self, async_result, callback=None):
+        self._async_result = async_result
+        self._callback = callback
+        self._done = False
+        self._value = None
+
+    @classmethod
+    def resolved(cls, value):
+        """ Returns future, already containing result value."""
+        future = cls(None)
+        future._done = True
+        future._value = value
+        return future
+
+    @property
+    def async_result(self):
+        return self._async_result
+
+    def ready(self):
+        return self._done or self._async_result.ready()
+
+    def result(self, timeout=None):
+        """ Waits for rpc result and returns converted value.
+
+        :param timeout: max seconds to wait for result backend
+        """
+        if not self._done:
+            data = self._async_result.get(timeout=timeout)
+            if self._callback is not None:
+                data = self._callback(data)
+            self._value = data
+            self._done = True
+        return self._value
+
+
+def gather(*futures, **kwargs):
+    """ Waits for all futures and returns list of their results.
+
+    All requests are already sent at this moment, so total wait time is
+    the time of slowest request, not the sum of them.
+    """
+    timeout = kwargs.pop('timeout', None)
+    assert not kwargs, "only timeout kwarg supported"
+    return [f.result(timeout=timeout) for f in futures]
+
+
+def fetch_many(*querysets, **kwargs):
+    """ Evaluates querysets with single batch request per rpc database.
+
+    :returns: list of evaluated queryset copies.
+    """
+    timeout = kwargs.pop('timeout', None)
+    assert not kwargs, "only timeout kwarg supported"
+    batches = {}
+    futures = []
+    for qs in querysets:
+        db = qs.model.Rpc.db
+        if db not in batches:
+            batches[db] = RpcClient.from_db(db).batch()
+        futures.append(qs.submit(batch=batches[db]))
+    for batch in batches.values():
+        batch.send()
+    return gather(*futures, timeout=timeout)
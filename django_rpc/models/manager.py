@@ -120,6 +120,10 @@ class RpcManager(RpcManagerBase):
     def bulk_create(self, *args, **kwargs):
         pass  # pragma: nocover
 
+    @manager_method
+    def bulk_update(self, *args, **kwargs):
+        pass  # pragma: nocover
+
     @manager_method
     def count(self, *args, **kwargs):
         pass  # pragma: nocover
@@ -164,3 +168,38 @@ class RpcManager(RpcManagerBase):
     def delete(self, *args, **kwargs):
         pass  # pragma: nocover
 
+    @manager_method
+    def future(self, *args, **kwargs):
+        pass  # pragma: nocover
+
+    @manager_method
+    def after(self, *args, **kwargs):
+        pass  # pragma: nocover
+
+    @manager_method
+    def paginate_by_key(self, *args, **kwargs):
+        pass  # pragma: nocover
+
+    @manager_method
+    def identity_map(self, *args, **kwargs):
+        pass  # pragma: nocover
+
+    @manager_method
+    def lazy(self, *args, **kwargs):
+        pass  # pragma: nocover
+
+    @manager_method
+    def to_columns(self, *args, **kwargs):
+        pass  # pragma: nocover
+
+    @manager_method
+    def to_arrays(self, *args, **kwargs):
+        pass  # pragma: nocover
+
+    @manager_method
+    def hint(self, *args, **kwargs):
+        pass  # pragma: nocover
+
+    @manager_method
+    def with_total(self, *args, **kwargs):
+        pass  # pragma: nocover
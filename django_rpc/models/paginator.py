@@ -0,0 +1,94 @@
+# coding: utf-8
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.utils.functional import cached_property
+from django.utils.translation import ugettext_lazy as _
+
+from django_rpc.celery.cache import LRUCache, RpcResultCache
+
+__all__ = ['RpcPaginator']
+
+
+class RpcPaginator(Paginator):
+    """ Paginator fetching page objects and total count with single request.
+
+    With cache_ttl set, total count is cached for cache_ttl seconds and
+    pages of same queryset are fetched without counting rows.
+    """
+    total_cache = LRUCache(1000)
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, cache_ttl=None):
+        super(RpcPaginator, self).__init__(
+            object_list, per_page, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page)
+        self.cache_ttl = cache_ttl
+
+    @cached_property
+    def count(self):
+        total = self.get_cached_total()
+        if total is None:
+            if self.get_limits() == (0, None):
+                total = self.object_list.count()
+            else:
+                # count request ignores limits of sliced queryset
+                qs = self.object_list.with_total()[:1]
+                list(qs)
+                total = self.limit_total(qs.total)
+            self.set_cached_total(total)
+        return total
+
+    def page(self, number):
+        if 'count' not in self.__dict__:
+            total = self.get_cached_total()
+            if total is not None:
+                self.__dict__['count'] = total
+        if 'count' in self.__dict__:
+            # pages are fetched with single request when count is known
+            return super(RpcPaginator, self).page(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        bottom = (number - 1) * self.per_page
+        qs = self.object_list.with_total()
+        qs = qs[bottom:bottom + self.per_page + self.orphans]
+        objects = list(qs)
+        # total is counted without limits of sliced object list
+        total = self.limit_total(qs.total)
+        self.__dict__['count'] = total
+        self.set_cached_total(total)
+        number = self.validate_number(number)
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        return self._get_page(objects[:top - bottom], number, self)
+
+    def get_limits(self):
+        """ Returns slice limits of object list."""
+        # noinspection PyProtectedMember
+        return self.object_list._limits
+
+    def limit_total(self, total):
+        """ Applies slice limits of object list to total count."""
+        start, stop = self.get_limits()
+        if stop is not None:
+            total = min(total, stop)
+        return max(total - start, 0)
+
+    def get_cache_key(self):
+        opts = self.object_list.model.Rpc
+        return RpcResultCache.make_key(opts.app_label, opts.name,
+                                       self.object_list.rpc_trace,
+                                       limits=self.get_limits())
+
+    def get_cached_total(self):
+        if not self.cache_ttl:
+            return None
+        return self.total_cache.get(self.get_cache_key())
+
+    def set_cached_total(self, total):
+        if self.cache_ttl:
+            self.total_cache.set(self.get_cache_key(), total,
+                                 ttl=self.cache_ttl)
@@ -1,15 +1,25 @@
 # coding: utf-8
 import functools
+import warnings
 from collections import namedtuple
-from datetime import datetime
 
 import pytz
+import six
 
+from django_rpc.celery import dates, defaults
+from django_rpc.celery.cache import LRUCache
 from django_rpc.celery.client import RpcClient
-from django_rpc.models import utils
+from django_rpc.celery.codecs import (iter_rows, count_rows, is_columnar,
+                                     parse_rows, parse_value)
+from django_rpc.models import columns, session, utils
+from django_rpc.models.fields import ForwardFKDescriptor, ReverseFKDescriptor
+from django_rpc.models.future import RpcFuture, gather
 
 Trace = namedtuple('Trace', ('method', 'args', 'kwargs'))
 
+# same as django.db.models.constants.LOOKUP_SEP
+LOOKUP_SEP = '__'
+
 
 def dict_filter(d, keys):
     return {k: v for k, v in d.items() if k in keys}
@@ -24,19 +34,158 @@ class BaseIterable(object):
 
     def __iter__(self):
         result = self.queryset.fetch()
-        for item in result:
-            yield self.queryset.instantiate(item)
+        for item in self.iterate(result):
+            yield item
+
+    def iterate(self, result):
+        """ Converts fetched rpc result to iterable items.
+
+        Instances of models with foreign keys share list of objects from
+        same result, so related objects are loaded for all of them at once.
+        """
+        queryset = self.queryset
+        identity_map = None
+        if queryset._identity_map:
+            identity_map = session.IdentityMap()
+        objects = queryset.instantiate_many(iter_rows(result), identity_map)
+        if not getattr(queryset.model, '_rpc_fk_descriptors', None):
+            return objects
+        # whole result is instantiated before first object is returned, so
+        # related objects are loaded for all rows when streaming too
+        objects = list(objects)
+        for obj in objects:
+            obj._rpc_siblings = objects
+        return iter(objects)
+
+
+class LazyResult(object):
+    """ Fetched result shared by its row proxies."""
+
+    def __init__(self, queryset, plan, index=None, parse=False):
+        """
+        :param plan: instance creation plan for result rows
+        :param index: column positions for columnar rows, None for dicts
+        :param parse: columnar row values are not parsed by client yet
+        """
+        self.queryset = queryset
+        self.plan = plan
+        self.index = index
+        self.parse = parse
+        self.pk_name = queryset._get_pk_field()
+        keep = plan.keep
+        # values returned by proxy without model instance
+        self.readable = frozenset(
+            k for k in plan.plain
+            if k not in plan.exclude and (keep is None or k in keep))
+
+    def get_data(self, row):
+        if self.index is None:
+            return row
+        if self.parse:
+            parse_rows([row])
+        return {k: row[i] for k, i in self.index.items()}
+
+    def get_value(self, row, name):
+        """ Returns plain value of row, parsing it on access."""
+        if self.index is None:
+            return row[name]
+        i = self.index[name]
+        if not self.parse:
+            return row[i]
+        value = row[i] = parse_value(row[i])
+        return value
+
+
+class RowProxy(object):
+    """ Read-only view of fetched row.
+
+    Plain values are read from row as is, model instance is created on
+    first access to other attributes or on assignment.
+    """
+    __slots__ = ('_result', '_row', '_instance')
+
+    def __init__(self, result, row):
+        self._result = result
+        self._row = row
+        self._instance = None
+
+    def materialize(self):
+        """ Returns model instance for row, creating it once."""
+        if self._instance is None:
+            result = self._result
+            self._instance = result.queryset.instantiate(
+                result.get_data(self._row), plan=result.plan)
+        return self._instance
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            # i.e. copy protocol lookups before slots are set
+            raise AttributeError(name)
+        result = self._result
+        if self._instance is None:
+            if name == 'pk':
+                name = result.pk_name
+            if name in result.readable:
+                return result.get_value(self._row, name)
+        return getattr(self.materialize(), name)
+
+    def __setattr__(self, name, value):
+        if name in RowProxy.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.materialize(), name, value)
+
+    def __eq__(self, other):
+        if isinstance(other, RowProxy):
+            other = other.materialize()
+        return self.materialize() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.materialize())
+
+    def __repr__(self):
+        return '<%s: %s>' % (type(self).__name__,
+                             getattr(self, self._result.pk_name, None))
+
+
+class LazyIterable(BaseIterable):
+    """ Returns row proxies instead of model instances."""
+
+    def iterate(self, result):
+        parse = False
+        if is_columnar(result):
+            names, rows = result['columns'], result['rows']
+            index = {c: i for i, c in enumerate(names)}
+            # values are parsed when read from proxy or its instance
+            parse = not result.parsed
+        else:
+            names, rows, index = None, result, None
+        if not rows:
+            return iter([])
+        # noinspection PyProtectedMember
+        plan = self.queryset._get_plan(names or rows[0])
+        lazy_result = LazyResult(self.queryset, plan, index, parse)
+        return (RowProxy(lazy_result, row) for row in rows)
 
 
 class EmptyIterable(BaseIterable):
     def __iter__(self):
         return iter([])
 
+    def iterate(self, result):
+        return iter([])
+
 
 class ValuesIterable(BaseIterable):
     def __iter__(self):
         result = self.queryset.fetch()
-        return iter(result)
+        return self.iterate(result)
+
+    def iterate(self, result):
+        return iter_rows(result)
 
 
 class DateTimeIterable(BaseIterable):
@@ -47,15 +196,8 @@ class DateTimeIterable(BaseIterable):
         # https://docs.djangoproject.com/en/1.10/ref/models/querysets/#datetimes
         self.tzinfo = tzinfo
 
-    def __iter__(self):
-        result = self.queryset.fetch()
-        for item in result:
-            # parse naive
-            dt = datetime.strptime(item, '%Y-%m-%dT%H:%M:%SZ')
-            # cast to utc
-            dt = datetime(*dt.timetuple()[:6], tzinfo=pytz.utc)
-            # move to local tz
-            yield dt.astimezone(self.tzinfo)
+    def iterate(self, result):
+        return iter(dates.parse_datetimes(result, self.tzinfo))
 
 
 # noinspection PyPep8Naming
@@ -64,10 +206,154 @@ def TZDateTimeIterable(tzinfo):
 
 
 class DateIterable(BaseIterable):
+    def iterate(self, result):
+        return iter(dates.parse_dates(result))
+
+
+class ChunkedIterable(object):
+    """ Fetches queryset results page by page.
+
+    Request for next page is sent before current page items are converted,
+    so network transfer overlaps with decoding and only one page is kept
+    in memory. Unordered model rows are paged by primary key with keyset
+    pagination instead.
+    """
+
+    def __init__(self, queryset, chunk_size):
+        """
+        :type queryset: RpcBaseQuerySet
+        """
+        assert chunk_size > 0, "chunk_size must be positive"
+        self.chunk_size = chunk_size
+        ordering = self.get_ordering(queryset)
+        plain = self.is_plain(queryset)
+        # default server ordering is unknown, so unordered model rows are
+        # paged by primary key with keyset pagination
+        self.keyset = (not ordering and plain and
+                       queryset._limits == (0, None))
+        self.chunked = bool(ordering)
+        if self.chunked and plain:
+            pk_names = {'pk', queryset._get_pk_field()}
+            if not any(isinstance(f, six.string_types) and
+                       f.lstrip('-') in pk_names for f in ordering):
+                # pk makes page boundaries stable for non-unique ordering
+                queryset = queryset._trace('order_by', ordering + ('pk',), {})
+        self.queryset = queryset
+
+    @staticmethod
+    def get_ordering(queryset):
+        """ Returns arguments of last order_by() call."""
+        for t in reversed(queryset.rpc_trace):
+            if t.method == 'order_by':
+                return tuple(t.args)
+        return ()
+
+    @staticmethod
+    def is_plain(queryset):
+        """ Checks that queryset returns model rows, one per instance.
+
+        Rows of values(), dates() or distinct() querysets may be grouped,
+        so extra ordering by pk changes their results.
+        """
+        # noinspection PyProtectedMember
+        if queryset._return_native:
+            return False
+        return not any(t.method == 'distinct' for t in queryset.rpc_trace)
+
+    def get_page(self, offset):
+        qs = self.queryset._clone()
+        qs._set_limits(offset, offset + self.chunk_size)
+        start, stop = qs._limits
+        if start == stop:
+            return None
+        return qs
+
     def __iter__(self):
-        result = self.queryset.fetch()
-        for item in result:
-            yield datetime.strptime(item, '%Y-%m-%d').date()
+        if self.queryset._iterable_class is EmptyIterable:
+            return
+        if self.keyset:
+            for page in self.queryset.paginate_by_key('pk', self.chunk_size):
+                for item in page:
+                    yield item
+            return
+        if not self.chunked:
+            # pages of unordered results may overlap or skip rows
+            warnings.warn("iterator(chunk_size) requires order_by() for "
+                          "sliced, values() or distinct() querysets; "
+                          "results are fetched with single request",
+                          RuntimeWarning, stacklevel=2)
+            for item in self.queryset._iterable_class(self.queryset):
+                yield item
+            return
+        offset = 0
+        qs = self.get_page(offset)
+        pending = qs.fetch_async() if qs is not None else None
+        while pending is not None:
+            page = qs
+            result = page._unwrap_total(pending.get())
+            pending = None
+            if count_rows(result) == self.chunk_size:
+                offset += self.chunk_size
+                qs = self.get_page(offset)
+                if qs is not None:
+                    # prefetch next page while current one is processed
+                    pending = qs.fetch_async()
+            iterable = page._iterable_class(page)
+            for item in iterable.iterate(result):
+                yield item
+
+
+class KeysetPage(list):
+    """ Page of objects fetched with keyset pagination."""
+
+    def __init__(self, objects, next_token):
+        super(KeysetPage, self).__init__(objects)
+        # opaque token for next page request; None for last page
+        self.next_token = next_token
+
+
+class InstancePlan(object):
+    """ Steps of model instance creation, shared by rows with same keys.
+
+    Descriptors are resolved once instead of each row; attributes removed
+    for only() and defer() are found with first instance.
+    """
+
+    def __init__(self, setters, keep=None, exclude=frozenset()):
+        """
+        :param setters: list of (key, setter) pairs, setter is None for
+            values stored to instance dict as is
+        :param keep: attributes kept on instance, None to keep all
+        :param exclude: attributes removed from instance
+        """
+        self.plain = [k for k, setter in setters if setter is None]
+        self.setters = [(k, setter) for k, setter in setters
+                        if setter is not None]
+        self.keep = keep
+        self.exclude = exclude
+        self.drop = None
+        # fields tracked for changes, found with first instance
+        self.tracked = None
+
+    def update(self, obj, data):
+        attrs = obj.__dict__
+        for k in self.plain:
+            attrs[k] = data[k]
+        for k, setter in self.setters:
+            setter(obj, data[k])
+
+    def prune(self, obj):
+        attrs = obj.__dict__
+        if self.drop is None:
+            keep = self.keep
+            self.drop = [k for k in attrs if k in self.exclude or
+                         keep is not None and k not in keep]
+        for k in self.drop:
+            attrs.pop(k, None)
+
+    def track(self, obj):
+        attrs = obj.__dict__
+        attrs[utils.STATE_ATTR] = {k: attrs[k] for k in self.tracked}
 
 
 class RpcBaseQuerySet(object):
@@ -81,22 +367,37 @@ class RpcBaseQuerySet(object):
         '_prefetch_fields',
         '_exclude_fields',
         '_iterable_class',
-        '_limits'
+        '_limits',
+        '_future',
+        '_client_prefetch',
+        '_identity_map',
+        '_iterate_hint',
+        '_with_total'
     ]
 
     _iterable_class = BaseIterable
 
+    # instance creation plans, shared by all querysets
+    _instance_plans = LRUCache(defaults.INSTANCE_PLAN_CACHE_SIZE)
+
     def __init__(self, model):
         self.model = model
         self._result_cache = None
         self.__trace = ()
         self.__field_list = ()
+        self.__instance_fields = frozenset()
         self._extra_fields = ()  # qs.extra()
         self._exclude_fields = ()  # qs.defer(), qs.only()
         self._related_fields = ()  # qs.select_related()
         self._prefetch_fields = ()  # qs.prefetch_related()
+        self._client_prefetch = ()  # qs.prefetch_related() for rpc relations
         self._limits = (0, None)  # qs[:]
         self._return_native = False
+        self._future = False  # qs.future()
+        self._identity_map = False  # qs.identity_map()
+        self._iterate_hint = True  # qs.hint()
+        self._with_total = False  # qs.with_total()
+        self._total = None
         super(RpcBaseQuerySet, self).__init__()
 
     def _trace(self, method, args, kwargs, iterable=None):
@@ -118,6 +419,7 @@ class RpcBaseQuerySet(object):
         clone = self.__class__(model=self.model)
         for f in self._rpc_cloned:
             setattr(clone, f, getattr(self, f))
+        clone.__trace = self.__trace
         return clone
 
     @property
@@ -135,13 +437,37 @@ class RpcBaseQuerySet(object):
         if value and pk_name not in value:
             value += (pk_name,)
         self.__field_list = value
-
-    def iterator(self):
+        # attributes kept by instantiate(); "fk__name" keeps related object
+        names = set(value)
+        for f in value:
+            if LOOKUP_SEP in f:
+                name = f.split(LOOKUP_SEP, 1)[0]
+                names.update((name, '%s_id' % name, '_%s_cache' % name))
+        self.__instance_fields = frozenset(names)
+
+    def iterator(self, chunk_size=None):
+        """ Iterates through queryset without filling result cache.
+
+        :param chunk_size: if set, results are fetched by pages of
+            chunk_size items with next page prefetched in background;
+            unordered model rows are paged by primary key.
+        """
+        if chunk_size:
+            return iter(ChunkedIterable(self, chunk_size))
         return iter(self._iterable_class(self))
 
     def _fetch_all(self):
         if self._result_cache is None:
             self._result_cache = list(self.iterator())
+            self._prefetch_related_objects()
+
+    def _prefetch_related_objects(self):
+        """ Loads related objects for result cache, one request per relation.
+        """
+        if not self._result_cache:
+            return
+        for name in self._client_prefetch:
+            getattr(self.model, name).load_related(self._result_cache)
 
     def __iter__(self):
         self._fetch_all()
@@ -182,33 +508,304 @@ class RpcBaseQuerySet(object):
         return qs
 
     def __len__(self):
+        if self._result_cache is None and self._count_only():
+            return self.count()
         self._fetch_all()
         return len(self._result_cache)
 
-    def instantiate(self, data):
+    def __bool__(self):
+        if self._result_cache is None and self._count_only():
+            return self.exists()
+        self._fetch_all()
+        return bool(self._result_cache)
+
+    __nonzero__ = __bool__
+
+    def _count_only(self):
+        """ Checks whether len() and bool() may skip fetching rows."""
+        return not self._iterate_hint and not self._future
+
+    def _is_ordered(self):
+        """ Checks whether result order is set with order_by()."""
+        for t in reversed(self.__trace):
+            if t.method == 'order_by':
+                return bool(t.args)
+        return False
+
+    def instantiate(self, data, identity_map=None, plan=None):
+        """ Creates model instance from fetched data.
+
+        If identity map is passed or rpc session is active, same instance is
+        returned for same remote row, including related objects.
+        """
+        if identity_map is None:
+            identity_map = session.get_identity_map()
+        if identity_map is None:
+            return self._instantiate(data, plan)
+        pk = data.get(self._get_pk_field())
+        if pk is None:
+            return self._instantiate(data, plan)
+        obj = identity_map.get(self.model, pk)
+        if obj is None:
+            with session.activate(identity_map):
+                obj = self._instantiate(data, plan)
+            identity_map.add(self.model, pk, obj)
+            return obj
+        if plan is None:
+            plan = self._get_plan(data)
+        attrs = obj.__dict__
+        if plan.tracked is None or any(k not in attrs for k in plan.tracked):
+            # instance was created from only() or defer() result
+            with session.activate(identity_map):
+                self._fill_missing(obj, self._instantiate(data, plan))
+        return obj
+
+    @staticmethod
+    def _fill_missing(obj, new):
+        """ Copies attributes not loaded yet to mapped instance."""
+        attrs = obj.__dict__
+        state = attrs.get(utils.STATE_ATTR)
+        new_state = new.__dict__.get(utils.STATE_ATTR, {})
+        for k, v in new.__dict__.items():
+            if k in attrs:
+                continue
+            attrs[k] = v
+            if state is not None and k in new_state:
+                state[k] = new_state[k]
+
+    def instantiate_many(self, rows, identity_map=None):
+        """ Creates instances for rows of same result with same keys."""
+        if identity_map is None:
+            identity_map = session.get_identity_map()
+        plan = None
+        for data in rows:
+            if plan is None:
+                plan = self._get_plan(data)
+            if identity_map is None:
+                yield self._instantiate(data, plan)
+            else:
+                yield self.instantiate(data, identity_map, plan)
+
+    def _instantiate(self, data, plan=None):
+        if plan is None:
+            plan = self._get_plan(data)
         obj = self.model()
-        self.update_model(obj, data)
-        for f in self._exclude_fields:
-            if hasattr(obj, f):
-                delattr(obj, f)
-        if self._field_list:
-            for k in list(obj.__dict__.keys()):
-                if k not in self._field_list:
-                    delattr(obj, k)
+        plan.update(obj, data)
+        plan.prune(obj)
+        if plan.tracked is None:
+            plan.tracked = [k for k in self._get_fields(obj)
+                            if k in obj.__dict__]
+        plan.track(obj)
         return obj
 
-    def fetch(self):
-        opts = self.model.Rpc
-        client = RpcClient.from_db(opts.db)
+    def _get_plan(self, data):
+        """ Returns cached instance creation plan for data keys."""
+        keys = tuple(data)
+        key = (type(self), self.model, keys) + self._get_plan_options()
+        plan = self._instance_plans.get(key)
+        if plan is None:
+            plan = self._build_plan(keys)
+            self._instance_plans.set(key, plan)
+        return plan
+
+    def _get_plan_options(self):
+        """ Returns queryset options affecting instance creation plan."""
+        keep = self.__instance_fields if self._field_list else None
+        return keep, tuple(self._exclude_fields)
+
+    def _build_plan(self, keys):
+        setters = [(k, self._get_setter(k)) for k in keys]
+        keep = self.__instance_fields if self._field_list else None
+        return InstancePlan(setters, keep, frozenset(self._exclude_fields))
+
+    def _get_setter(self, name):
+        """ Returns function setting fetched value to model instance.
+
+        None is returned for values stored to instance dict as is.
+        """
+        descriptor = getattr(self.model, name, None)
+        if hasattr(descriptor, 'set'):
+            return descriptor.set
+        if hasattr(type(descriptor), '__set__'):
+            return lambda obj, value: setattr(obj, name, value)
+        return None
+
+    def _fetch_kwargs(self):
         extra_fields = (self._extra_fields + self._related_fields +
                         self._prefetch_fields)
+        kwargs = dict(fields=self._field_list or None,
+                      extra_fields=extra_fields,
+                      exclude_fields=self._exclude_fields,
+                      native=self._return_native,
+                      limits=self._limits)
+        if self._with_total:
+            kwargs['with_total'] = True
+        return kwargs
+
+    def _unwrap_total(self, result):
+        """ Stores total count of with_total() result and returns rows."""
+        if not self._with_total:
+            return result
+        self._total = result['total']
+        return result['results']
+
+    @property
+    def total(self):
+        """ Count of rows without limits, fetched with qs.with_total()."""
+        return self._total
+
+    def fetch(self, columnar=False):
+        """
+        :param columnar: request columns + rows result format regardless
+            of client settings.
+        """
+        opts = self.model.Rpc
+        client = RpcClient.from_db(opts.db)
         result = client.fetch(opts.app_label, opts.name, self.__trace,
-                              fields=self._field_list or None,
-                              extra_fields=extra_fields,
-                              exclude_fields=self._exclude_fields,
-                              native=self._return_native,
-                              limits=self._limits)
-        return result
+                              cache_ttl=opts.cache_ttl, columnar=columnar,
+                              **self._fetch_kwargs())
+        return self._unwrap_total(result)
+
+    def fetch_async(self, batch=None):
+        """ Sends fetch request and returns celery AsyncResult.
+
+        :param batch: RpcBatch instance collecting requests to send them
+            together.
+        """
+        opts = self.model.Rpc
+        client = batch or RpcClient.from_db(opts.db)
+        return client.fetch_async(opts.app_label, opts.name, self.__trace,
+                                  **self._fetch_kwargs())
+
+    def after(self, **kwargs):
+        """ Returns rows after key value, ordered by key field.
+
+        >>> qs.after(pk=100)  # same as qs.filter(pk__gt=100).order_by('pk')
+        """
+        assert len(kwargs) == 1, "single key field expected"
+        (field, value), = kwargs.items()
+        qs = self._trace('filter', (), {'%s__gt' % field: value})
+        return qs._trace('order_by', (field,), {})
+
+    def paginate_by_key(self, field='pk', size=100, token=None):
+        """ Iterates through queryset pages using keyset pagination.
+
+        Each page is filtered by last seen value of unique field instead of
+        OFFSET, so deep pages are fetched with index seeks.
+
+        :param field: unique field name, optionally prefixed with '-'
+        :param size: page size
+        :param token: KeysetPage.next_token to continue iteration from
+        :returns: generator of KeysetPage objects
+        """
+        assert self._limits == (0, None), "can't paginate sliced queryset"
+        assert not self._return_native, "can't paginate values queryset"
+        if self._iterable_class is EmptyIterable:
+            return
+        opts = self.model.Rpc
+        client = RpcClient.from_db(opts.db)
+        kwargs = self._fetch_kwargs()
+        # keyset pages are not counted
+        kwargs.pop('with_total', None)
+        iterable = self._iterable_class(self)
+        while True:
+            kwargs['keyset'] = (field, token, size)
+            data = client.fetch(opts.app_label, opts.name, self.__trace,
+                                **kwargs)
+            token = data['next']
+            yield KeysetPage(iterable.iterate(data['results']), token)
+            if token is None:
+                break
+
+    def future(self):
+        """ Switches queryset to deferred mode.
+
+        Final methods like get(), first() or count() return RpcFuture
+        instead of result; use submit() to send request for whole queryset.
+        """
+        qs = self._clone()
+        qs._future = True
+        return qs
+
+    def to_columns(self, *fields):
+        """ Returns dict of values lists for fields, like values(*fields).
+
+        Result is fetched in columnar format and transposed without creating
+        dict or tuple for each row.
+        """
+        qs = self.values(*fields)
+        if qs._iterable_class is EmptyIterable:
+            return {name: [] for name in fields}
+        return columns.get_columns(qs.fetch(columnar=True), fields)
+
+    def to_arrays(self, *fields, **kwargs):
+        """ Returns dict of numpy arrays for fields, see to_columns().
+
+        :param dtypes: dict of numpy dtypes for fields; dates and datetimes
+            are returned as datetime64 by default.
+        """
+        dtypes = kwargs.pop('dtypes', None)
+        assert not kwargs, "only dtypes kwarg supported"
+        return columns.to_arrays(self.to_columns(*fields), dtypes)
+
+    def with_total(self):
+        """ Fetches count of rows without limits together with results.
+
+        Count is available as qs.total after evaluation.
+        """
+        qs = self._clone()
+        qs._with_total = True
+        return qs
+
+    def hint(self, iterate=True):
+        """ Tells how queryset is used after len() or bool() call.
+
+        :param iterate: if False, len() and bool() of unevaluated queryset
+            send count() and exists() requests instead of fetching rows.
+        """
+        qs = self._clone()
+        qs._iterate_hint = iterate
+        return qs
+
+    def lazy(self):
+        """ Returns row proxies creating model instances on demand.
+
+        Plain field values are read from fetched rows as is, instance is
+        created on access to other attributes, i.e. relations or methods.
+        """
+        qs = self._clone()
+        qs._iterable_class = LazyIterable
+        return qs
+
+    def identity_map(self):
+        """ Rows of result sharing same remote object get same instance.
+
+        Related objects returned by select_related() are shared too.
+        """
+        qs = self._clone()
+        qs._identity_map = True
+        return qs
+
+    def submit(self, batch=None):
+        """ Sends fetch request to rpc server without waiting for result.
+
+        :param batch: RpcBatch instance collecting requests to send them
+            together.
+        :returns: RpcFuture resolving to evaluated queryset copy.
+        """
+        qs = self._clone()
+        iterable = qs._iterable_class(qs)
+        if isinstance(iterable, EmptyIterable):
+            qs._result_cache = []
+            return RpcFuture.resolved(qs)
+
+        def fill_cache(result):
+            result = qs._unwrap_total(result)
+            qs._result_cache = list(iterable.iterate(result))
+            qs._prefetch_related_objects()
+            return qs
+
+        return RpcFuture(qs.fetch_async(batch=batch), fill_cache)
 
     def annotate(self, *args, **kwargs):
         kw = {expr: expr.default_alias for expr in args}
@@ -226,11 +823,27 @@ class RpcBaseQuerySet(object):
         return qs
 
     def prefetch_related(self, *args, **kwargs):
-        qs = self._trace('prefetch_related', args, kwargs)
+        """ Prefetches related objects.
+
+        Rpc ForeignKey relations are loaded by client with separate request
+        per relation, so each related object is transferred once; other
+        lookups are prefetched by rpc server and nested into results.
+        """
         if args and args[0] is None:
+            qs = self._trace('prefetch_related', args, kwargs)
             qs._prefetch_fields = ()
+            qs._client_prefetch = ()
+            return qs
+        client_side = tuple(a for a in args if isinstance(
+            getattr(self.model, a, None),
+            (ForwardFKDescriptor, ReverseFKDescriptor)))
+        server_side = tuple(a for a in args if a not in client_side)
+        if server_side or kwargs:
+            qs = self._trace('prefetch_related', server_side, kwargs)
+            qs._prefetch_fields += server_side
         else:
-            qs._prefetch_fields += tuple(args)
+            qs = self._clone()
+        qs._client_prefetch += client_side
         return qs
 
     def extra(self, *args, **kwargs):
@@ -295,14 +908,41 @@ class RpcBaseQuerySet(object):
             offset += batch_size
         return inserted
 
+    def bulk_update(self, objects, fields, batch_size=None):
+        """ Saves different fields values of objects with single request.
+
+        :param fields: names of saved fields
+        :param batch_size: count of objects sent with single request,
+            all objects by default
+        :returns: count of updated rows
+        """
+        assert fields, "fields are required for bulk_update"
+        opts = self.model.Rpc
+        client = RpcClient.from_db(opts.db)
+        pk_field = self._get_pk_field()
+        names = list(fields)
+        attnames = [self._get_attname(name) for name in names]
+        objects = list(objects)
+        if not objects:
+            return 0
+        assert all(getattr(obj, pk_field, None) is not None
+                   for obj in objects), "bulk_update of unsaved objects"
+
+        total = len(objects)
+        batch_size = batch_size or total
+        updated = 0
+        for offset in range(0, total, batch_size):
+            updating = objects[offset:offset + batch_size]
+            rows = [[getattr(obj, k) for k in [pk_field] + attnames]
+                    for obj in updating]
+            updated += client.bulk_update(opts.app_label, opts.name, names,
+                                          rows)
+            for obj in updating:
+                utils.update_state(obj, attnames)
+        return updated
+
     def update_model(self, obj, data):
-        model = type(obj)
-        for k, v in data.items():
-            try:
-                descriptor = getattr(model, k)
-                descriptor.set(obj, v)
-            except AttributeError:
-                setattr(obj, k, v)
+        self._get_plan(data).update(obj, data)
 
     def get_or_create(self, *args, **kwargs):
         rpc = self.model.Rpc
@@ -326,7 +966,11 @@ class RpcBaseQuerySet(object):
 
     @staticmethod
     def _get_fields(obj):
-        return list(obj.__dict__.keys())
+        return [k for k in obj.__dict__.keys() if not k.startswith('_')]
+
+    def _get_attname(self, name):
+        """ Returns instance attribute storing field value."""
+        return name
 
     def _get_pk_field(self):
         return self.model.Rpc.pk_field
@@ -338,11 +982,29 @@ class RpcBaseQuerySet(object):
         qs._return_native = True
         return qs
 
-    # noinspection PyUnusedLocal
-    def in_bulk(self, *args, **kwargs):
-        objects = list(self.iterator())
-        pk_name = self._get_pk_field()
-        return {getattr(obj, pk_name): obj for obj in objects}
+    def in_bulk(self, id_list=None, field_name='pk'):
+        """ Returns dict of objects with field values from id_list.
+
+        Only requested rows are fetched; long lists are split to chunks,
+        which are requested concurrently.
+        """
+        assert self._limits == (0, None), \
+            "Cannot use 'limit' or 'offset' with in_bulk"
+        if field_name == 'pk':
+            field_name = self._get_pk_field()
+        if id_list is None:
+            objects = list(self.iterator())
+        else:
+            id_list = list(id_list)
+            if not id_list:
+                return {}
+            client = RpcClient.from_db(self.model.Rpc.db)
+            size = client.in_bulk_batch_size
+            lookup = '%s__in' % field_name
+            futures = [self.filter(**{lookup: id_list[i:i + size]}).submit()
+                       for i in range(0, len(id_list), size)]
+            objects = [obj for qs in gather(*futures) for obj in qs]
+        return {getattr(obj, field_name): obj for obj in objects}
 
     # noinspection PyUnusedLocal
     def as_manager(self, *args, **kwargs):
@@ -353,6 +1015,21 @@ class RpcBaseQuerySet(object):
         return manager_class()
 
 
+def cached_first(qs):
+    cache = qs._result_cache
+    if len(cache) > 1 and not qs._is_ordered():
+        # first() orders by pk unordered queryset
+        return NotImplemented
+    return cache[0] if cache else None
+
+
+def cached_last(qs):
+    cache = qs._result_cache
+    if len(cache) > 1 and not qs._is_ordered():
+        return NotImplemented
+    return cache[-1] if cache else None
+
+
 class RpcQuerySet(RpcBaseQuerySet):
     """
     Official Django QuerySet API
@@ -448,6 +1125,9 @@ class RpcQuerySet(RpcBaseQuerySet):
 
     bulk_create = RpcBaseQuerySet.bulk_create
 
+    bulk_update = RpcBaseQuerySet.bulk_update
+
+    @utils.cached_result(lambda qs: len(qs._result_cache))
     @utils.value_method
     def count(self, *args, **kwargs):
         pass  # pragma: nocover
@@ -464,10 +1144,12 @@ class RpcQuerySet(RpcBaseQuerySet):
     def earliest(self, *args, **kwargs):
         pass  # pragma: nocover
 
+    @utils.cached_result(cached_first)
     @utils.single_object_method
     def first(self, *args, **kwargs):
         pass  # pragma: nocover
 
+    @utils.cached_result(cached_last)
     @utils.single_object_method
     def last(self, *args, **kwargs):
         pass  # pragma: nocover
@@ -476,6 +1158,7 @@ class RpcQuerySet(RpcBaseQuerySet):
     def aggregate(self, *args, **kwargs):
         pass  # pragma: nocover
 
+    @utils.cached_result(lambda qs: bool(qs._result_cache))
     @utils.value_method
     def exists(self, *args, **kwargs):
         pass  # pragma: nocover
@@ -0,0 +1,57 @@
+# coding: utf-8
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class IdentityMap(object):
+    """ Instances created from rpc results, keyed by model and primary key.
+    """
+
+    def __init__(self):
+        self._objects = {}
+
+    def get(self, model, pk, default=None):
+        return self._objects.get((model, pk), default)
+
+    def add(self, model, pk, obj):
+        self._objects[model, pk] = obj
+
+    def clear(self):
+        self._objects.clear()
+
+    def __len__(self):
+        return len(self._objects)
+
+
+def get_identity_map():
+    """ Returns identity map active in current thread or None."""
+    return getattr(_local, 'identity_map', None)
+
+
+@contextmanager
+def activate(identity_map):
+    """ Makes identity map active in current thread."""
+    previous = get_identity_map()
+    _local.identity_map = identity_map
+    try:
+        yield identity_map
+    finally:
+        _local.identity_map = previous
+
+
+@contextmanager
+def session():
+    """ Returns same instance for same remote row fetched in current thread.
+
+    Nested sessions share identity map of outer session. Instances already
+    present in identity map are not updated with newer data, only fields
+    missing in them after only() or defer() are filled.
+    """
+    identity_map = get_identity_map()
+    if identity_map is not None:
+        yield identity_map
+        return
+    with activate(IdentityMap()) as identity_map:
+        yield identity_map
@@ -1,6 +1,11 @@
 # coding: utf-8
 import functools
 
+from django_rpc.models.future import RpcFuture
+
+# instance attribute with field values received from rpc server
+STATE_ATTR = '_rpc_state'
+
 
 def queryset_method(func):
     @functools.wraps(func)
@@ -14,6 +19,10 @@ def single_object_method(func):
     def inner(self, *args, **kwargs):
         qs = self._trace(func.__name__, args, kwargs)
         # noinspection PyProtectedMember
+        qs._with_total = False
+        # noinspection PyProtectedMember
+        if qs._future:
+            return RpcFuture(qs.fetch_async(), qs.instantiate)
         data = qs.fetch()
         instance = qs.instantiate(data)
         return instance
@@ -26,11 +35,37 @@ def value_method(func):
         qs = self._trace(func.__name__, args, kwargs)
         qs._return_native = True
         # noinspection PyProtectedMember
+        qs._with_total = False
+        # noinspection PyProtectedMember
+        if qs._future:
+            return RpcFuture(qs.fetch_async())
         result = qs.fetch()
         return result
     return inner
 
 
+def cached_result(getter):
+    """ Returns value from result cache of evaluated queryset.
+
+    :param getter: function computing value from queryset result cache,
+        returns NotImplemented if request is still needed.
+    """
+    def wrapper(func):
+        @functools.wraps(func)
+        def inner(self, *args, **kwargs):
+            # noinspection PyProtectedMember
+            if self._result_cache is not None and not args and not kwargs:
+                value = getter(self)
+                if value is not NotImplemented:
+                    # noinspection PyProtectedMember
+                    if self._future:
+                        return RpcFuture.resolved(value)
+                    return value
+            return func(self, *args, **kwargs)
+        return inner
+    return wrapper
+
+
 def values_queryset_method(iterable):
     def wrapper(func):
         @functools.wraps(func)
@@ -49,3 +84,33 @@ def manager_method(func):
         return method(*args, **kwargs)
 
     return inner
+
+
+def get_changed_fields(obj, fields, pk_field):
+    """ Returns fields changed since instance was fetched.
+
+    None is returned for instances not received from rpc server and for
+    instances with primary key reset or changed, which are saved in full.
+    Changes made in place to mutable values are not detected.
+    """
+    attrs = obj.__dict__
+    state = attrs.get(STATE_ATTR)
+    if state is None:
+        return None
+    pk = attrs.get(pk_field)
+    if pk is None or pk != state.get(pk_field):
+        return None
+    missing = object()
+    return [k for k in fields
+            if k in attrs and state.get(k, missing) != attrs[k]]
+
+
+def update_state(obj, fields):
+    """ Marks fields as saved to rpc server."""
+    attrs = obj.__dict__
+    state = attrs.get(STATE_ATTR)
+    if state is None:
+        return
+    for k in fields:
+        if k in attrs:
+            state[k] = attrs[k]
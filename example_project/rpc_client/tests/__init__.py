@@ -3,3 +3,6 @@
 
 from .django_tests import *
 from .celery_tests import *
+from .cache_tests import *
+from .tasks_tests import *
+from .codecs_tests import *
@@ -1,17 +1,28 @@
 # coding: utf-8
+import warnings
 from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
-from unittest import TestCase
+from unittest import TestCase, skipIf
 
 import pytz
 from celery import Task
+from django.core.paginator import EmptyPage, PageNotAnInteger
 from django.db import models
-from django.db.models import Count, signals
+from django.db.models import Count, Max, signals
+from django.db.models.functions import Coalesce
 from django.utils.timezone import now
 from mock import mock
 
 from django_rpc.celery import codecs, app
+from django_rpc.celery.cache import LRUCache, RpcResultCache
+from django_rpc.celery.client import RpcClient
+from django_rpc.models import RpcFuture, gather, fetch_many, session
+from django_rpc.models import RpcPaginator
+from django_rpc.models import columns
+from django_rpc.models import utils
 from django_rpc.models.compat import DJ110
+from django_rpc.models.query import RpcBaseQuerySet
 
 
 def encode_decode(data):
@@ -188,6 +199,33 @@ class QuerySetTestsMixin(TestCase):
         self.assertTrue(hasattr(c, '_fk_cache'))
         self.assertObjectsEqual(c.fk, s.fk)
 
+    def testSelectRelatedNull(self):
+        c = self.client_model.objects.select_related('fk').get(pk=self.s2.pk)
+        self.assertIsNone(c.fk)
+        self.assertIsNone(c.fk_id)
+
+    def testOnlyRelated(self):
+        qs = self.client_model.objects.filter(pk=1).select_related('fk')
+        qs = qs.only('char_field', 'fk', 'fk__name')
+        c = qs[0]
+        s = self.server_model.objects.filter(pk=1).select_related(
+            'fk').only('char_field', 'fk', 'fk__name')[0]
+        self.assertEqual(c.char_field, s.char_field)
+        self.assertEqual(c.fk.name, s.fk.name)
+        self.assertEqual(c.fk.id, s.fk.id)
+
+    def testDeferRelated(self):
+        qs = self.client_model.objects.filter(pk=1).select_related('fk')
+        c = qs.defer('fk__name')[0]
+        self.assertNotIn('name', c.fk.__dict__)
+        self.assertEqual(c.fk.id, self.server_model.objects.get(pk=1).fk_id)
+
+    def testValuesRelated(self):
+        data = list(self.client_model.objects.values('char_field', 'fk__name'))
+        expected = list(self.server_model.objects.values(
+            'char_field', 'fk__name'))
+        self.assertListEqual(data, expected)
+
     def testClearSelectRelated(self):
         qs = self.client_model.objects.filter(pk=1)
         c = qs[0]
@@ -405,6 +443,11 @@ class QuerySetTestsMixin(TestCase):
         s1 = ss[self.s1.pk]
         self.assertObjectsEqual(c1, s1)
 
+    def testInBulkEmpty(self):
+        with self.mock_celery_task() as apply:
+            self.assertDictEqual(self.client_model.objects.in_bulk([]), {})
+        self.assertFalse(apply.called)
+
     def testIterator(self):
         client_iter = self.client_model.objects.filter(pk=self.s1.pk).iterator()
         server_iter = self.server_model.objects.filter(pk=self.s1.pk).iterator()
@@ -437,6 +480,46 @@ class QuerySetTestsMixin(TestCase):
         real = self.client_model.objects.aggregate(c=models.Count('*'))
         self.assertDictEqual(expected, real)
 
+    def testAggregateExpression(self):
+        expected = self.server_model.objects.aggregate(
+            c=models.Count('fk', distinct=True),
+            s=models.Sum(models.F('int_field') * 2))
+        real = self.client_model.objects.aggregate(
+            c=models.Count('fk', distinct=True),
+            s=models.Sum(models.F('int_field') * 2))
+        self.assertDictEqual(expected, real)
+
+    def testFilterExpressions(self):
+        qs = self.client_model.objects.filter(
+            models.Q(int_field=models.F('pk')) & ~models.Q(pk=self.s2.pk))
+        self.assertQuerySetEqual(qs, [self.s1])
+
+    def testAnnotateExpressions(self):
+        def annotate(manager, fk_manager):
+            return manager.annotate(
+                kind=models.Case(
+                    models.When(int_field__gt=1, then=models.Value('big')),
+                    default=models.Value('small'),
+                    output_field=models.CharField()),
+                name=Coalesce('char_field', models.Value('')),
+                fk_name=models.Subquery(
+                    fk_manager.filter(
+                        pk=models.OuterRef('fk')).values('name'),
+                    output_field=models.CharField()),
+            ).order_by('pk').values_list('kind', 'name', 'fk_name')
+        expected = list(annotate(self.server_model.objects,
+                                 self.fk_model.objects))
+        real = annotate(self.client_model.objects,
+                        self.fk_client_model.objects)
+        self.assertListEqual([tuple(r) for r in real], expected)
+
+    def testUpdateFExpression(self):
+        result = self.client_model.objects.filter(
+            pk=self.s1.pk).update(int_field=models.F('int_field') + 10)
+        self.assertEqual(result, 1)
+        self.s1.refresh_from_db()
+        self.assertEqual(self.s1.int_field, 11)
+
     def testExists(self):
         exists = self.client_model.objects.filter(int_field=1).exists()
         self.assertIs(exists, True)
@@ -589,3 +672,563 @@ class QuerySetTestsMixin(TestCase):
     @staticmethod
     def mock_celery_task():
         return mock.patch('celery.app.task.Task.apply_async')
+
+
+class RpcQuerySetTestsMixin(QuerySetTestsMixin):
+    """ Tests for QuerySet API extensions available only with RPC enabled."""
+
+    def testFutureSubmit(self):
+        with self.mock_celery_task() as apply:
+            qs = self.client_model.objects.future().filter(pk=self.s1.pk)
+        self.assertFalse(apply.called)
+        f = qs.submit()
+        self.assertIsInstance(f, RpcFuture)
+        result = f.result(timeout=10)
+        self.assertIsNotNone(result._result_cache)
+        self.assertQuerySetEqual(result, [self.s1])
+
+    def testIdentityMap(self):
+        self.s2.fk_id = self.s1.fk_id
+        self.s2.save()
+        qs = self.client_model.objects.order_by('pk').select_related('fk')
+        c1, c2 = qs
+        self.assertIsNot(c1.fk, c2.fk)
+        c1, c2 = qs.identity_map()
+        self.assertIs(c1.fk, c2.fk)
+        self.assertEqual(c1.fk.name, self.s1.fk.name)
+
+    def testInstancePlanReused(self):
+        qs = self.client_model.objects.only('char_field')
+        list(qs)
+        plans = qs._instance_plans
+        keys, misses = plans.keys(), plans.misses
+        c1, c2 = qs.order_by('pk')
+        self.assertListEqual(plans.keys(), keys)
+        self.assertEqual(plans.misses, misses)
+        self.assertEqual(c1.char_field, self.s1.char_field)
+        self.assertNotIn('int_field', c2.__dict__)
+
+    def testInstancePlanCacheSize(self):
+        with mock.patch.object(RpcBaseQuerySet, '_instance_plans',
+                               LRUCache(2)):
+            qs = self.client_model.objects.all()
+            for fields in ('char_field', 'int_field', 'dt_field'):
+                list(qs.only(fields))
+            plans = qs._instance_plans
+            self.assertEqual(len(plans), 2)
+            self.assertEqual(plans.evictions, 1)
+
+    def testLazy(self):
+        qs = self.client_model.objects.order_by('pk').select_related('fk')
+        p1, p2 = qs.lazy()
+        self.assertEqual(p1.char_field, self.s1.char_field)
+        self.assertEqual(p1.pk, self.s1.pk)
+        self.assertIsNone(p1._instance)
+        self.assertEqual(p1.fk.id, self.s1.fk_id)
+        self.assertIsInstance(p1._instance, self.client_model)
+        self.assertEqual(p1.dt_field, self.s1.dt_field)
+        self.assertEqual(p1, p1.materialize())
+        p2.int_field = 100500
+        self.assertEqual(p2.materialize().int_field, 100500)
+        self.assertEqual(p2.int_field, 100500)
+
+    def testLazyOnly(self):
+        p, = self.client_model.objects.filter(
+            pk=self.s1.pk).only('char_field').lazy()
+        self.assertEqual(p.char_field, self.s1.char_field)
+        self.assertEqual(p.id, self.s1.id)
+        self.assertIsNone(p._instance)
+        self.assertNotIn('int_field', p.materialize().__dict__)
+
+    def testToColumns(self):
+        qs = self.client_model.objects.order_by('pk')
+        data = qs.to_columns('id', 'char_field', 'd_field')
+        expected = self.server_model.objects.order_by('pk')
+        self.assertDictEqual(data, {
+            'id': [s.id for s in expected],
+            'char_field': [s.char_field for s in expected],
+            'd_field': [s.d_field for s in expected]})
+        self.assertDictEqual(qs.none().to_columns('id'), {'id': []})
+        self.assertDictEqual(qs.filter(pk=-1).to_columns('id'), {'id': []})
+
+    @skipIf(columns.numpy is None, "numpy not installed")
+    def testToArrays(self):
+        qs = self.client_model.objects.order_by('pk')
+        data = qs.to_arrays('int_field', 'dt_field', 'd_field', 'fk_id',
+                            dtypes={'fk_id': float})
+        self.assertEqual(data['int_field'].dtype.kind, 'i')
+        self.assertListEqual(list(data['int_field']), [1, 2])
+        self.assertEqual(str(data['dt_field'].dtype), 'datetime64[us]')
+        self.assertEqual(data['dt_field'][0].item(),
+                         self.s1.dt_field.replace(tzinfo=None))
+        self.assertEqual(str(data['d_field'].dtype), 'datetime64[D]')
+        self.assertEqual(data['d_field'][1].item(), self.s2.d_field)
+        self.assertEqual(data['fk_id'][0], self.s1.fk_id)
+        self.assertTrue(columns.numpy.isnan(data['fk_id'][1]))
+
+    def testInBulkFieldName(self):
+        cc = self.client_model.objects.in_bulk(
+            [self.s1.char_field, 'missing'], field_name='char_field')
+        self.assertListEqual(list(cc.keys()), [self.s1.char_field])
+        self.assertEqual(cc[self.s1.char_field].id, self.s1.pk)
+
+    def testInBulkChunks(self):
+        client = RpcClient.from_db(self.client_model.Rpc.db)
+        with mock.patch.object(client, 'in_bulk_batch_size', 1):
+            with self.mock_celery_task() as apply:
+                self.client_model.objects.in_bulk([self.s1.pk, self.s2.pk])
+        self.assertEqual(apply.call_count, 2)
+        with mock.patch.object(client, 'in_bulk_batch_size', 1):
+            cc = self.client_model.objects.in_bulk([self.s1.pk, self.s2.pk])
+        self.assertSetEqual(set(cc.keys()), {self.s1.pk, self.s2.pk})
+        self.assertEqual(cc[self.s2.pk].char_field, self.s2.char_field)
+
+    def testResultCacheReused(self):
+        qs = self.client_model.objects.order_by('-pk')
+        list(qs)
+        with self.mock_celery_task() as apply:
+            self.assertEqual(qs.count(), 2)
+            self.assertTrue(qs.exists())
+            self.assertEqual(qs.first().id, self.s2.pk)
+            self.assertEqual(qs.last().id, self.s1.pk)
+            self.assertEqual(qs[1].id, self.s1.pk)
+        self.assertFalse(apply.called)
+
+        evaluated = qs.future().submit().result()
+        with self.mock_celery_task() as apply:
+            self.assertEqual(evaluated.count().result(), 2)
+        self.assertFalse(apply.called)
+
+        qs = self.client_model.objects.filter(pk=-1)
+        list(qs)
+        with self.mock_celery_task() as apply:
+            self.assertEqual(qs.count(), 0)
+            self.assertFalse(qs.exists())
+            self.assertIsNone(qs.first())
+        self.assertFalse(apply.called)
+
+    def testUnorderedFirstNotCached(self):
+        qs = self.client_model.objects.all()
+        list(qs)
+        with self.mock_celery_task() as apply:
+            qs.first()
+        self.assertTrue(apply.called)
+
+    def testHintIterate(self):
+        qs = self.client_model.objects.hint(iterate=False)
+        self.assertEqual(len(qs), 2)
+        self.assertTrue(qs)
+        self.assertFalse(qs.filter(pk=-1))
+        self.assertIsNone(qs._result_cache)
+        qs = self.client_model.objects.all()
+        self.assertEqual(len(qs), 2)
+        self.assertIsNotNone(qs._result_cache)
+
+    def testWithTotal(self):
+        qs = self.client_model.objects.order_by('pk').with_total()[:1]
+        with self.mock_celery_passthrough() as apply:
+            items = list(qs)
+        self.assertEqual(apply.call_count, 1)
+        self.assertEqual([c.id for c in items], [self.s1.pk])
+        self.assertEqual(qs.total, 2)
+        qs = self.client_model.objects.with_total().filter(pk=-1)
+        self.assertEqual(list(qs), [])
+        self.assertEqual(qs.total, 0)
+        self.assertEqual(self.client_model.objects.with_total().count(), 2)
+
+    def testPaginator(self):
+        qs = self.client_model.objects.order_by('pk')
+        paginator = RpcPaginator(qs, 1)
+        with self.mock_celery_passthrough() as apply:
+            page = paginator.page(2)
+        self.assertEqual(apply.call_count, 1)
+        self.assertEqual([c.id for c in page], [self.s2.pk])
+        self.assertEqual(paginator.count, 2)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertFalse(page.has_next())
+        with self.mock_celery_passthrough() as apply:
+            page = paginator.page(1)
+            items = list(page)
+        self.assertEqual(apply.call_count, 1)
+        self.assertEqual([c.id for c in items], [self.s1.pk])
+        self.assertTrue(page.has_next())
+        self.assertRaises(EmptyPage, RpcPaginator(qs, 1).page, 3)
+        self.assertRaises(EmptyPage, RpcPaginator(qs, 1).page, 0)
+        self.assertRaises(PageNotAnInteger, RpcPaginator(qs, 1).page, 'x')
+
+    def testPaginatorOrphans(self):
+        qs = self.client_model.objects.order_by('pk')
+        page = RpcPaginator(qs, 1, orphans=1).page(1)
+        self.assertEqual([c.id for c in page], [self.s1.pk, self.s2.pk])
+        self.assertEqual(page.paginator.num_pages, 1)
+
+    def testPaginatorCachedTotal(self):
+        qs = self.client_model.objects.order_by('pk')
+        RpcPaginator.total_cache.clear()
+        RpcPaginator(qs, 1, cache_ttl=60).page(1)
+        with mock.patch.object(RpcClient, 'fetch',
+                               side_effect=RpcClient.fetch,
+                               autospec=True) as fetch:
+            items = list(RpcPaginator(qs, 1, cache_ttl=60).page(2))
+        self.assertEqual([c.id for c in items], [self.s2.pk])
+        self.assertEqual(fetch.call_count, 1)
+        self.assertNotIn('with_total', fetch.call_args[1])
+        RpcPaginator.total_cache.clear()
+
+    def testPaginatorSliced(self):
+        qs = self.client_model.objects.order_by('pk')
+        page = RpcPaginator(qs[1:], 1).page(1)
+        self.assertEqual([c.id for c in page], [self.s2.pk])
+        self.assertEqual(page.paginator.count, 1)
+        self.assertFalse(page.has_next())
+        self.assertEqual(RpcPaginator(qs[:1], 1).count, 1)
+        self.assertEqual(RpcPaginator(qs[5:], 1).count, 0)
+
+    def testPaginatorCachedTotalSliced(self):
+        qs = self.client_model.objects.order_by('pk')
+        RpcPaginator.total_cache.clear()
+        RpcPaginator(qs, 1, cache_ttl=60).page(1)
+        paginator = RpcPaginator(qs[1:], 1, cache_ttl=60)
+        self.assertIsNone(paginator.get_cached_total())
+        self.assertEqual(paginator.count, 1)
+        RpcPaginator.total_cache.clear()
+
+    def testModelSaveChangedFields(self):
+        c = self.client_model.objects.get(id=self.s1.id)
+        c.char_field = 'changed'
+        with mock.patch.object(RpcClient, 'update',
+                               side_effect=RpcClient.update,
+                               autospec=True) as update:
+            c.save()
+        self.assertEqual(update.call_count, 1)
+        self.assertEqual(update.call_args[0][4], {'char_field': 'changed'})
+        self.assertEqual(self.server_model.objects.get(pk=c.id).char_field,
+                         'changed')
+
+        with mock.patch.object(RpcClient, 'update',
+                               autospec=True) as update:
+            c.save()
+        self.assertFalse(update.called)
+
+        c.int_field = 100500
+        with mock.patch.object(RpcClient, 'update',
+                               side_effect=RpcClient.update,
+                               autospec=True) as update:
+            c.save()
+        self.assertEqual(update.call_args[0][4], {'int_field': 100500})
+
+    def testModelSaveCopy(self):
+        c = self.client_model.objects.get(id=self.s1.id)
+        c.id = None
+        c.save()
+        self.assertIsNotNone(c.id)
+        self.assertNotEqual(c.id, self.s1.id)
+        self.assertEqual(self.server_model.objects.count(), 3)
+        s = self.server_model.objects.get(pk=c.id)
+        self.assertEqual(s.char_field, self.s1.char_field)
+        self.assertEqual(s.int_field, self.s1.int_field)
+
+    def testModelSavePkChanged(self):
+        c = self.client_model.objects.get(id=self.s1.id)
+        c.id = self.s2.id
+        c.save()
+        s2 = self.server_model.objects.get(pk=self.s2.id)
+        self.assertEqual(s2.char_field, self.s1.char_field)
+        self.assertEqual(s2.int_field, self.s1.int_field)
+        self.assertEqual(self.server_model.objects.count(), 2)
+
+    def testModelSaveNotFetched(self):
+        c = self.client_model(id=self.s1.id, char_field='new', int_field=1)
+        with mock.patch.object(RpcClient, 'update',
+                               side_effect=RpcClient.update,
+                               autospec=True) as update:
+            c.save(force_update=True)
+        self.assertIn('int_field', update.call_args[0][4])
+        self.assertIn('char_field', update.call_args[0][4])
+
+    def testBulkUpdate(self):
+        c1, c2 = self.client_model.objects.order_by('pk')
+        c1.int_field, c2.int_field = 101, 102
+        c1.char_field, c2.char_field = 'first', 'second'
+        with self.mock_celery_passthrough() as apply:
+            updated = self.client_model.objects.bulk_update(
+                [c1, c2], ['int_field', 'char_field'])
+        self.assertEqual(apply.call_count, 1)
+        self.assertEqual(updated, 2)
+        s1, s2 = self.server_model.objects.order_by('pk')
+        self.assertEqual((s1.int_field, s1.char_field), (101, 'first'))
+        self.assertEqual((s2.int_field, s2.char_field), (102, 'second'))
+        self.assertEqual(s1.dt_field, self.s1.dt_field)
+        with mock.patch.object(RpcClient, 'update', autospec=True) as update:
+            c1.save()
+        self.assertFalse(update.called)
+
+    def testBulkUpdateBatchSize(self):
+        c1, c2 = self.client_model.objects.order_by('pk')
+        c1.int_field, c2.int_field = 201, 202
+        with self.mock_celery_passthrough() as apply:
+            updated = self.client_model.objects.bulk_update(
+                [c1, c2], ['int_field'], batch_size=1)
+        self.assertEqual(apply.call_count, 2)
+        self.assertEqual(updated, 2)
+        self.assertListEqual(
+            list(self.server_model.objects.order_by('pk').values_list(
+                'int_field', flat=True)), [201, 202])
+        self.assertEqual(self.client_model.objects.bulk_update([], ['id']), 0)
+
+    def testSession(self):
+        qs = self.client_model.objects.filter(pk=self.s1.pk)
+        with session() as identity_map:
+            c1 = qs.get()
+            c2, = qs.select_related('fk')
+            self.assertIs(c1, c2)
+            self.assertEqual(len(identity_map), 1)
+            with session() as nested:
+                self.assertIs(nested, identity_map)
+                self.assertIs(qs.first(), c1)
+        self.assertIsNot(qs.get(), c1)
+
+    def testSessionDeferredFields(self):
+        qs = self.client_model.objects.filter(pk=self.s1.pk)
+        with session():
+            c1 = qs.only('char_field').get()
+            self.assertNotIn('int_field', c1.__dict__)
+            c2 = qs.get()
+            self.assertIs(c1, c2)
+            self.assertEqual(c1.int_field, self.s1.int_field)
+            self.assertEqual(c1.dt_field, qs.get().dt_field)
+            c1.int_field = 100500
+            self.assertEqual(
+                utils.get_changed_fields(c1, ['char_field', 'int_field'],
+                                         'id'), ['int_field'])
+
+    def testFutureSubmitNone(self):
+        with self.mock_celery_task() as apply:
+            f = self.client_model.objects.none().submit()
+            self.assertListEqual(list(f.result()), [])
+        self.assertFalse(apply.called)
+
+    def testFutureFirst(self):
+        f = self.client_model.objects.order_by('char_field').future().first()
+        self.assertIsInstance(f, RpcFuture)
+        s1 = self.server_model.objects.order_by('char_field').first()
+        self.assertObjectsEqual(f.result(), s1)
+
+    def testFutureCount(self):
+        f = self.client_model.objects.future().count()
+        self.assertIsInstance(f, RpcFuture)
+        self.assertEqual(f.result(), self.server_model.objects.count())
+
+    def testFutureAggregate(self):
+        f = self.client_model.objects.future().aggregate(c=models.Count('*'))
+        expected = self.server_model.objects.aggregate(c=models.Count('*'))
+        self.assertDictEqual(f.result(), expected)
+
+    def testGather(self):
+        qs = self.client_model.objects.future()
+        f1 = qs.filter(pk=self.s1.pk).submit()
+        f2 = qs.get(pk=self.s2.pk)
+        r1, r2 = gather(f1, f2, timeout=10)
+        self.assertQuerySetEqual(r1, [self.s1])
+        self.assertObjectsEqual(r2, self.s2)
+
+    def testFetchMany(self):
+        qs1 = self.client_model.objects.filter(pk=self.s1.pk)
+        qs2 = self.client_model.objects.order_by('-pk')
+        with self.mock_celery_passthrough() as apply:
+            r1, r2, r3 = fetch_many(qs1, qs2, qs1.none())
+        self.assertEqual(apply.call_count, 1)
+        self.assertQuerySetEqual(r1, [self.s1])
+        self.assertQuerySetEqual(r2, [self.s2, self.s1])
+        self.assertListEqual(list(r3), [])
+
+    def testClientBatch(self):
+        opts = self.client_model.Rpc
+        client = RpcClient.from_db(opts.db)
+        trace = self.client_model.objects.filter(pk=self.s1.pk).rpc_trace
+        with self.mock_celery_passthrough() as apply:
+            with client.batch() as batch:
+                r1 = batch.fetch_async(opts.app_label, opts.name, trace)
+                r2 = batch.fetch_async(opts.app_label, opts.name, (),
+                                       limits=(0, 1))
+            self.assertEqual(apply.call_count, 1)
+        rows = list(codecs.iter_rows(r1.get()))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], self.s1.pk)
+        self.assertEqual(codecs.count_rows(r2.get()), 1)
+
+    @staticmethod
+    def mock_celery_passthrough():
+        """ Counts task calls still passing them to celery."""
+        return mock.patch.object(Task, 'delay', side_effect=Task.delay,
+                                 autospec=True)
+
+    def testIteratorChunkSize(self):
+        self.clone(self.s1, 5)
+        expected = list(self.server_model.objects.order_by('pk'))
+        qs = self.client_model.objects.order_by('pk')
+        with self.mock_celery_passthrough() as apply:
+            result = list(qs.iterator(chunk_size=3))
+        self.assertEqual(apply.call_count, 3)
+        self.assertEqual(len(result), len(expected))
+        for real, exp in zip(result, expected):
+            self.assertObjectsEqual(real, exp)
+
+    def testIteratorChunkSizeUnordered(self):
+        self.clone(self.s1, 5)
+        expected = list(self.server_model.objects.order_by('pk'))
+        qs = self.client_model.objects.filter(int_field=self.s1.int_field)
+        expected_filtered = [s.pk for s in expected
+                             if s.int_field == self.s1.int_field]
+        with self.mock_celery_passthrough() as apply:
+            result = list(self.client_model.objects.iterator(chunk_size=3))
+        # 7 rows are paged by primary key
+        self.assertEqual(apply.call_count, 3)
+        self.assertEqual(apply.call_args[1]['keyset'][0], 'pk')
+        self.assertListEqual([c.id for c in result], [s.pk for s in expected])
+        result = list(qs.iterator(chunk_size=2))
+        self.assertListEqual([c.id for c in result], expected_filtered)
+
+    def testIteratorChunkSizeUnorderedValues(self):
+        qs = self.client_model.objects.values_list('int_field', flat=True)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            result = list(qs.iterator(chunk_size=1))
+        self.assertEqual(len(w), 1)
+        self.assertTrue(issubclass(w[0].category, RuntimeWarning))
+        self.assertListEqual(sorted(result), sorted(
+            self.server_model.objects.values_list('int_field', flat=True)))
+
+    def testIteratorChunkSizeReverse(self):
+        self.clone(self.s1, 5)
+        qs = self.client_model.objects.order_by('int_field').reverse()
+        expected = self.server_model.objects.order_by(
+            'int_field', 'pk').reverse()
+        result = list(qs.iterator(chunk_size=2))
+        self.assertListEqual([c.id for c in result], [s.pk for s in expected])
+
+    def testIteratorChunkSizeDistinct(self):
+        self.clone(self.s1, 5)
+        qs = self.client_model.objects.values_list(
+            'int_field', flat=True).distinct()
+        expected = self.server_model.objects.values_list(
+            'int_field', flat=True).distinct()
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter('always')
+            result = sorted(qs.iterator(chunk_size=1))
+        self.assertListEqual(result, sorted(expected))
+        result = list(qs.order_by('int_field').iterator(chunk_size=1))
+        self.assertListEqual(result, list(expected.order_by('int_field')))
+
+    def testIteratorChunkSizeAnnotate(self):
+        self.clone(self.s1, 5)
+        qs = self.client_model.objects.values('int_field').annotate(
+            c=Count('id')).order_by('int_field')
+        expected = self.server_model.objects.values('int_field').annotate(
+            c=Count('id')).order_by('int_field')
+        result = list(qs.iterator(chunk_size=1))
+        self.assertListEqual([dict(r) for r in result],
+                             [dict(r) for r in expected])
+
+    def testIteratorChunkSizeDates(self):
+        self.clone(self.s1, 5)
+        qs = self.client_model.objects.dates('d_field', 'day')
+        expected = list(self.server_model.objects.dates('d_field', 'day'))
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter('always')
+            self.assertListEqual(list(qs.iterator(chunk_size=1)), expected)
+        qs = qs.order_by('-d_field')
+        self.assertListEqual(list(qs.iterator(chunk_size=1)),
+                             expected[::-1])
+
+    def testIteratorChunkSizeSliced(self):
+        self.clone(self.s1, 5)
+        qs = self.client_model.objects.order_by('-pk')[1:6]
+        with self.mock_celery_passthrough() as apply:
+            result = list(qs.values_list('pk', flat=True).iterator(
+                chunk_size=2))
+        self.assertEqual(apply.call_count, 3)
+        expected = self.server_model.objects.order_by('-pk')[1:6]
+        self.assertListEqual(result, [s.pk for s in expected])
+
+    def testAggregateColumnsRows(self):
+        result = self.client_model.objects.aggregate(
+            columns=Count('id'), rows=Max('int_field'))
+        expected = self.server_model.objects.aggregate(
+            columns=Count('id'), rows=Max('int_field'))
+        self.assertDictEqual(result, expected)
+
+    def testFetchWithoutKeyset(self):
+        with self.mock_celery_passthrough() as apply:
+            list(self.client_model.objects.all())
+        self.assertNotIn('keyset', apply.call_args[1])
+        with self.mock_celery_passthrough() as apply:
+            list(self.client_model.objects.paginate_by_key('pk', 5))
+        self.assertEqual(list(apply.call_args[1]['keyset']), ['pk', None, 5])
+
+    def testAfter(self):
+        qs = self.client_model.objects.after(pk=self.s1.pk)
+        self.assertQuerySetEqual(qs, [self.s2])
+
+    def testPaginateByKey(self):
+        self.clone(self.s1, 5)
+        expected = list(self.server_model.objects.order_by('-pk'))
+        pages = list(self.client_model.objects.paginate_by_key('-pk', 3))
+        self.assertListEqual([len(p) for p in pages], [3, 3, 1])
+        self.assertIsNone(pages[-1].next_token)
+        result = [obj for page in pages for obj in page]
+        for real, exp in zip(result, expected):
+            self.assertObjectsEqual(real, exp)
+
+    def testPaginateByKeyToken(self):
+        self.clone(self.s1, 5)
+        qs = self.client_model.objects.filter(int_field=1)
+        expected = list(self.server_model.objects.filter(
+            int_field=1).order_by('pk'))
+        first = next(qs.paginate_by_key(size=2))
+        self.assertIsNotNone(first.next_token)
+        with self.mock_celery_passthrough() as apply:
+            second = next(qs.paginate_by_key(size=2, token=first.next_token))
+        self.assertEqual(apply.call_count, 1)
+        self.assertQuerySetEqual(first + second, expected[:4])
+
+    def testResultCache(self):
+        with self.enable_result_cache() as cache:
+            with self.mock_celery_passthrough() as apply:
+                for _ in range(2):
+                    qs = self.client_model.objects.filter(pk=self.s1.pk)
+                    self.assertQuerySetEqual(qs, [self.s1])
+            self.assertEqual(apply.call_count, 1)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def testResultCacheInvalidation(self):
+        with self.enable_result_cache() as cache:
+            qs = self.client_model.objects.filter(pk=self.s1.pk)
+            list(qs)
+            self.assertEqual(len(cache), 1)
+            qs.update(int_field=100500)
+            self.assertEqual(len(cache), 0)
+            self.assertEqual(qs.get().int_field, 100500)
+
+    def testResultCacheMutation(self):
+        with self.enable_result_cache():
+            qs = self.client_model.objects.filter(pk=self.s1.pk)
+            row, = qs.values('char_field')
+            row['char_field'] = 'MUTATED'
+            agg = qs.aggregate(c=Count('id'))
+            agg['c'] = -1
+            with self.mock_celery_task() as apply:
+                self.assertListEqual(list(qs.values('char_field')),
+                                     [{'char_field': self.s1.char_field}])
+                self.assertDictEqual(qs.aggregate(c=Count('id')), {'c': 1})
+            self.assertFalse(apply.called)
+
+    @contextmanager
+    def enable_result_cache(self):
+        """ Enables fetch result cache for client model."""
+        client = RpcClient.from_db(self.client_model.Rpc.db)
+        cache = RpcResultCache(10)
+        with mock.patch.object(client, 'cache', cache), \
+                mock.patch.object(self.client_model.Rpc, 'cache_ttl', 60):
+            yield cache
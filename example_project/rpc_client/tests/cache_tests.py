@@ -0,0 +1,53 @@
+# coding: utf-8
+from unittest import TestCase
+
+from mock import mock
+
+from django_rpc.celery.cache import LRUCache, RpcResultCache
+
+
+class LRUCacheTestCase(TestCase):
+
+    def testEviction(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertDictEqual(cache.stats(), {
+            'size': 2, 'hits': 3, 'misses': 1, 'evictions': 1})
+
+    def testTTL(self):
+        cache = LRUCache(2)
+        with mock.patch('time.time', return_value=100):
+            cache.set('a', 1, ttl=10)
+        with mock.patch('time.time', return_value=105):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('time.time', return_value=111):
+            self.assertIs(cache.get('a', cache.missing), cache.missing)
+        self.assertEqual(len(cache), 0)
+
+    def testInvalidate(self):
+        cache = RpcResultCache(10)
+        k1 = cache.make_key('app', 'Model', [['filter', [], {'a': 1}]])
+        k2 = cache.make_key('app', 'Other', [['filter', [], {'a': 1}]])
+        self.assertNotEqual(k1, k2)
+        self.assertEqual(
+            k1, cache.make_key('app', 'Model', (('filter', (), {'a': 1}),)))
+        cache.set(k1, [])
+        cache.set(k2, [])
+        cache.invalidate('app', 'Model')
+        self.assertListEqual(cache.keys(), [k2])
+
+    def testResultsCopied(self):
+        cache = RpcResultCache(10)
+        result = [{'char_field': 'value'}]
+        cache.set('a', result)
+        result[0]['char_field'] = 'MUTATED'
+        cached = cache.get('a')
+        self.assertListEqual(cached, [{'char_field': 'value'}])
+        cached[0]['char_field'] = 'MUTATED'
+        self.assertListEqual(cache.get('a'), [{'char_field': 'value'}])
@@ -22,7 +22,7 @@ def use_file_sqlite():
 
 @skipIf(not use_file_sqlite(),
         reason=':memory: SQLite database is not working with multiprocessing')
-class NativeCeleryTestCase(base.QuerySetTestsMixin, base.BaseRpcTestCase,
+class NativeCeleryTestCase(base.RpcQuerySetTestsMixin, base.BaseRpcTestCase,
                            TestCase):
     client_model = NativeModel
     server_model = ServerModel
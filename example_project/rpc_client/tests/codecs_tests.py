@@ -0,0 +1,256 @@
+# coding: utf-8
+import datetime
+import decimal
+import json
+import uuid
+from decimal import Decimal
+from unittest import TestCase, skipIf
+
+import jsonpickle
+import pytz
+from django.db import models
+from django.db.models import Q, F, Value, Count, Sum
+from django.db.models.expressions import (
+    Case, ExpressionWrapper, OuterRef, Subquery, When)
+from django.db.models.functions import Cast, Coalesce, Concat, Substr
+from kombu.serialization import registry
+
+from django_rpc.celery import codecs, dates, defaults
+from django_rpc.celery.conf import _merge_dict
+from django_rpc.models.query import Trace
+from rpc_client.models import FKClientModel
+from rpc_server.models import FKModel
+
+
+class ExpressionTestsMixin(object):
+    dumps = loads = None
+
+    def encode_decode(self, data):
+        return self.loads(self.dumps(data))
+
+    def testExpressions(self):
+        expressions = [
+            Q(a=1) | ~Q(b__in=[2, 3], c=F('d')),
+            F('a') + Value(1) * F('b'),
+            Value(Decimal('1.5'), output_field=models.DecimalField(
+                max_digits=5, decimal_places=2)),
+            ExpressionWrapper(F('a') - F('b'),
+                              output_field=models.DurationField()),
+            Case(When(Q(a__gt=1), then=F('b')), When(c=2, then=Value(3)),
+                 default=Value(0), output_field=models.IntegerField()),
+            Count('*'),
+            Count('a', distinct=True),
+            Sum(F('a') * 2),
+            models.StdDev('a', sample=True),
+            Coalesce('a', 'b', Value('')),
+            Concat('a', Value(' '), 'b'),
+            Substr('a', 2, 3),
+            Cast('a', models.CharField(max_length=10)),
+            OuterRef('a'),
+        ]
+        for e in expressions:
+            result = self.encode_decode({'e': e})['e']
+            self.assertIs(type(result), type(e))
+            self.assertEqual(repr(result), repr(e))
+
+    def testSubquery(self):
+        qs = FKClientModel.objects.filter(pk=OuterRef('fk')).values('name')
+        result = self.encode_decode(Subquery(
+            qs, output_field=models.CharField()))
+        self.assertIsInstance(result, Subquery)
+        self.assertIs(result.queryset.model, FKModel)
+        self.assertIsInstance(result.output_field, models.CharField)
+        self.assertListEqual(list(result.queryset.query.values_select),
+                             ['name'])
+
+    def testUnsupportedExpression(self):
+        with self.assertRaises(TypeError):
+            self.dumps(models.functions.Trunc('a', 'day'))
+
+
+class TypedCodecTestsMixin(ExpressionTestsMixin):
+    """ Common tests for codecs preserving value types."""
+
+    def testTypes(self):
+        data = [
+            datetime.datetime(2017, 1, 2, 3, 4, 5, 6789, tzinfo=pytz.utc),
+            datetime.datetime(2017, 1, 2, 3, 4, 5),
+            datetime.date(2017, 1, 2),
+            datetime.time(3, 4, 5, 6789),
+            datetime.timedelta(days=-1, seconds=5, microseconds=6),
+            decimal.Decimal('-1.50'),
+            uuid.uuid4(),
+            u'строка',
+            None, True, 1, 1.5,
+        ]
+        self.assertListEqual(self.encode_decode(data), data)
+
+    def testAwareDatetime(self):
+        tz = pytz.timezone('Europe/Moscow')
+        dt = tz.localize(datetime.datetime(2017, 1, 2, 3, 4, 5))
+        result = self.encode_decode(dt)
+        self.assertEqual(result, dt)
+        self.assertIs(result.tzinfo, pytz.utc)
+
+    def testDjangoObjects(self):
+        q = Q(a=1) | ~Q(b__in=[2, 3])
+        result = self.encode_decode({'q': q, 'agg': Sum('a')})
+        self.assertEqual(str(result['q']), str(q))
+        self.assertIsInstance(result['agg'], Sum)
+        self.assertEqual(repr(result['agg']), repr(Sum('a')))
+
+    def testPlainStrings(self):
+        """ Strings looking like dates are not parsed."""
+        data = {'dt': '2017-01-02T03:04:05Z', 'd': '2017-01-02'}
+        self.assertDictEqual(self.encode_decode(data), data)
+
+    def testIterables(self):
+        data = [('tuple', 1), (i for i in range(2))]
+        self.assertListEqual(self.encode_decode(data),
+                             [['tuple', 1], [0, 1]])
+
+    def testNamedTuple(self):
+        trace = Trace('filter', (), {'dt__lt': datetime.date(2017, 1, 2)})
+        self.assertListEqual(self.encode_decode(trace), [
+            'filter', [], {'dt__lt': datetime.date(2017, 1, 2)}])
+
+
+@skipIf(codecs.msgpack is None, "msgpack is not installed")
+class MsgpackCodecTestCase(TypedCodecTestsMixin, TestCase):
+    dumps = staticmethod(codecs.x_rpc_msgpack_dumps)
+    loads = staticmethod(codecs.x_rpc_msgpack_loads)
+
+    def testBytes(self):
+        self.assertEqual(self.encode_decode(b'bytes'), b'bytes')
+
+
+class Json2CodecTestCase(TypedCodecTestsMixin, TestCase):
+    dumps = staticmethod(codecs.x_rpc_json2_dumps)
+    loads = staticmethod(codecs.x_rpc_json2_loads)
+
+    def testTagLikeDict(self):
+        data = {'_t': 'unknown', '_v': 1}
+        self.assertDictEqual(self.encode_decode(data), data)
+
+
+class JsonCodecTestCase(ExpressionTestsMixin, TestCase):
+    dumps = staticmethod(codecs.x_rpc_json_dumps)
+    loads = staticmethod(codecs.x_rpc_json_loads)
+
+    def testQObjectsCompatible(self):
+        """ Q objects and aggregates are encoded for previous versions."""
+        for e in (Q(a=1) | ~Q(b=F('c')), Sum(F('a') * 2)):
+            data = json.loads(self.dumps({'e': e}))['e']
+            self.assertListEqual(list(data), ['_'])
+            self.assertEqual(repr(jsonpickle.decode(data['_'])), repr(e))
+
+    def testLegacyExpressions(self):
+        """ Q objects encoded by previous versions are decoded."""
+        q = Q(a=1) | Q(b=2)
+        data = json.dumps({'q': {'_': jsonpickle.encode(q)}})
+        self.assertEqual(str(self.loads(data)['q']), str(q))
+
+    def testColumnarRows(self):
+        """ Scalar values of columnar result rows are parsed."""
+        rows = [['2017-01-02', 'text']]
+        codecs.parse_rows(rows)
+        self.assertListEqual(rows, [[datetime.date(2017, 1, 2), 'text']])
+
+    def testColumnsRowsDict(self):
+        """ Dicts with "columns" and "rows" keys are decoded as is."""
+        data = {'a': {'columns': 1, 'rows': 2},
+                'b': {'columns': ['2017-01-02'], 'rows': [['x']]}}
+        result = codecs.x_rpc_json_loads(codecs.x_rpc_json_dumps(data))
+        self.assertDictEqual(result, data)
+        data = {'columns': Count('id'), 'rows': Count('id')}
+        result = codecs.x_rpc_json_loads(codecs.x_rpc_json_dumps(data))
+        self.assertEqual(repr(result['columns']), repr(Count('id')))
+
+
+class DatesTestCase(TestCase):
+
+    def testParseDateTime(self):
+        utc = pytz.utc
+        for value, expected in (
+                ('2017-03-01T10:55:18Z',
+                 datetime.datetime(2017, 3, 1, 10, 55, 18, tzinfo=utc)),
+                ('2017-03-01T10:55:18.055Z',
+                 datetime.datetime(2017, 3, 1, 10, 55, 18, 55000, tzinfo=utc)),
+                ('2017-03-01T10:55:18.000123Z',
+                 datetime.datetime(2017, 3, 1, 10, 55, 18, 123, tzinfo=utc)),
+        ):
+            self.assertEqual(dates.parse_datetime(value), expected)
+            self.assertEqual(codecs.x_rpc_json_loads(
+                json.dumps({'v': value}))['v'], expected)
+
+    def testParseDateTimesTZInfo(self):
+        tz = pytz.timezone('Europe/Moscow')
+        values = ['2010-03-27T22:59:00Z', '2010-03-27T23:00:00Z',
+                  '2010-10-30T22:59:00Z', '2010-10-30T23:00:00Z']
+        result = dates.parse_datetimes(values, tz)
+        for v, dt in zip(values, result):
+            expected = dates.parse_datetime(v).astimezone(tz)
+            self.assertEqual(dt, expected)
+            self.assertEqual(dt.utcoffset(), expected.utcoffset())
+        decoded = datetime.datetime(2017, 1, 1, tzinfo=pytz.utc)
+        self.assertEqual(dates.parse_datetimes([decoded], tz)[0].tzinfo.zone,
+                         tz.zone)
+
+    def testNotDates(self):
+        data = {'d': '2017-01-02 is not a date', 'dt': '2017-01-02T10:00:00Z!'}
+        self.assertDictEqual(codecs.x_rpc_json_loads(json.dumps(data)), data)
+
+    @skipIf(dates.numpy is None, "numpy not installed")
+    def testDateTime64(self):
+        dt = datetime.datetime(2017, 3, 1, 13, 55, 18, 55000,
+                               tzinfo=pytz.timezone('Etc/GMT-3'))
+        result = dates.to_datetime64(['2017-03-01T10:55:18.055000Z', dt, None])
+        self.assertEqual(result[0], result[1])
+        self.assertEqual(result[0].item(),
+                         datetime.datetime(2017, 3, 1, 10, 55, 18, 55000))
+        self.assertTrue(dates.numpy.isnat(result[2]))
+
+
+class CompressedCodecTestCase(TestCase):
+
+    def testThreshold(self):
+        dumps, loads = codecs.compressed(
+            codecs.x_rpc_json_dumps, codecs.x_rpc_json_loads, 'zlib', 100)
+        small = {'a': 1}
+        data = dumps(small)
+        self.assertEqual(data[:1], codecs.PLAIN)
+        self.assertDictEqual(loads(data), small)
+        large = [{'a': 'text %s' % i} for i in range(100)]
+        data = dumps(large)
+        self.assertEqual(data[:1], codecs.COMPRESSED)
+        self.assertLess(len(data), len(codecs.x_rpc_json_dumps(large)))
+        self.assertListEqual(loads(data), large)
+
+    def testCompressors(self):
+        data = [datetime.date(2017, 1, 2)] * 100
+        for name in codecs.COMPRESSORS:
+            for serializer in ('x-rpc-json', 'x-rpc-json2'):
+                codec, content_type = codecs.register_compressed_codec(
+                    serializer, name, 10)
+                self.assertEqual(codec, '%s+%s:10' % (serializer, name))
+                ct, encoding, payload = registry.dumps(data, codec)
+                self.assertEqual(ct, content_type)
+                self.assertListEqual(registry.loads(payload, ct, encoding), [
+                    '2017-01-02' if serializer == 'x-rpc-json' else d
+                    for d in data])
+
+    def testDatabaseSettings(self):
+        config = _merge_dict({'ENGINE': defaults.ENGINE,
+                              'COMPRESSION': 'zlib',
+                              'COMPRESSION_THRESHOLD': 10,
+                              'CELERY_RESULT_SERIALIZER': 'x-rpc-json2'})
+        self.assertEqual(config['CELERY_TASK_SERIALIZER'],
+                         'x-rpc-json+zlib:10')
+        self.assertEqual(config['CELERY_RESULT_SERIALIZER'],
+                         'x-rpc-json2+zlib:10')
+        self.assertIn('application/json+django-rpc-backend:v2+zlib',
+                      config['CELERY_ACCEPT_CONTENT'])
+        self.assertTrue(codecs.is_typed_codec(
+            config['CELERY_RESULT_SERIALIZER']))
+        self.assertNotIn('application/json+django-rpc-backend:v2+zlib',
+                         defaults.CELERY_ACCEPT_CONTENT)
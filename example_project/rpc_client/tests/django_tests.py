@@ -1,17 +1,24 @@
 # coding: utf-8
 
+import pickle
+from unittest import skipIf
+
+import six
 from django.db import models
 from django.test import TestCase
 from mock import mock
 
-from django_rpc.models import RpcModel
+from django_rpc.celery import codecs
+from django_rpc.celery.client import RpcClient
+from django_rpc.celery.tasks import BaseRpcTask
+from django_rpc.models import RpcModel, utils
 from django_rpc.models.fields import ForeignKey
 from rpc_client.models import ClientModel, FKClientModel
 from rpc_client.tests import base
 from rpc_server.models import ServerModel, FKModel
 
 
-class DjangoQuerySetTestCase(base.QuerySetTestsMixin, base.BaseRpcTestCase,
+class DjangoQuerySetTestCase(base.RpcQuerySetTestsMixin, base.BaseRpcTestCase,
                              TestCase):
     client_model = ClientModel
     server_model = ServerModel
@@ -19,6 +26,16 @@ class DjangoQuerySetTestCase(base.QuerySetTestsMixin, base.BaseRpcTestCase,
     fk_model =  FKModel
     fixtures = ['tests.json']
 
+    def testModelSaveNewPk(self):
+        c = self.client_model.objects.get(id=self.s1.id)
+        c.pk = 77
+        c.save()
+        pks = self.server_model.objects.order_by('pk').values_list(
+            'pk', flat=True)
+        self.assertListEqual(list(pks), [1, 2, 77])
+        self.assertEqual(self.server_model.objects.get(pk=77).char_field,
+                         self.s1.char_field)
+
 
 class DisabledRpcDjangoTestCase(base.QuerySetTestsMixin, base.BaseRpcTestCase,
                                 TestCase):
@@ -79,10 +96,172 @@ class NativeModel(RpcModel):
     fk = ForeignKey(NativeFKModel)
 
 
-class NativeQuerySetTestCase(base.QuerySetTestsMixin, base.BaseRpcTestCase,
+class NativeQuerySetTestCase(base.RpcQuerySetTestsMixin, base.BaseRpcTestCase,
                              TestCase):
     client_model = NativeModel
     server_model = ServerModel
     fk_client_model = NativeFKModel
     fk_model = FKModel
     fixtures = ['tests.json']
+
+    def testModelSaveMissingRow(self):
+        c = self.client_model.objects.get(id=self.s1.id)
+        self.server_model.objects.filter(pk=self.s1.pk).delete()
+        c.int_field = 100500
+        with self.assertRaises(Exception):
+            c.save()
+        self.assertEqual(utils.get_changed_fields(c, ['int_field'], 'id'),
+                         ['int_field'])
+        self.assertEqual(self.server_model.objects.count(), 1)
+
+    def testModelSaveNewPk(self):
+        c = self.client_model.objects.get(id=self.s1.id)
+        c.id = 77
+        with self.assertRaises(Exception):
+            c.save()
+        self.assertEqual(self.server_model.objects.count(), 2)
+
+    def testForwardFKBatchLoading(self):
+        fks = [self.fk_model.objects.create(name=str(i)) for i in range(3)]
+        for i in range(6):
+            self.server_model.objects.create(int_field=i, fk=fks[i % 3])
+        expected = [s.fk.name if s.fk else None
+                    for s in self.server_model.objects.order_by('pk')]
+        with self.mock_celery_passthrough() as apply:
+            objects = list(self.client_model.objects.order_by('pk'))
+            names = [o.fk.name if o.fk else None for o in objects]
+        self.assertListEqual(names, expected)
+        # single fetch for objects and single fetch for all related objects
+        self.assertEqual(apply.call_count, 2)
+        self.assertIs(objects[2].fk, objects[5].fk)
+
+    def testForwardFKBatchLoadingIterator(self):
+        fks = [self.fk_model.objects.create(name=str(i)) for i in range(3)]
+        for i in range(6):
+            self.server_model.objects.create(int_field=i, fk=fks[i % 3])
+        expected = [s.fk.name if s.fk else None
+                    for s in self.server_model.objects.order_by('pk')]
+        qs = self.client_model.objects.order_by('pk')
+        with self.mock_celery_passthrough() as apply:
+            names = [o.fk.name if o.fk else None for o in qs.iterator()]
+        self.assertListEqual(names, expected)
+        self.assertEqual(apply.call_count, 2)
+        with self.mock_celery_passthrough() as apply:
+            names = [o.fk.name if o.fk else None
+                     for o in qs.iterator(chunk_size=4)]
+        self.assertListEqual(names, expected)
+        # two full pages, empty last page and related objects for each page
+        self.assertEqual(apply.call_count, 5)
+
+    def testReverseFK(self):
+        fk = self.fk_model.objects.create(name='x')
+        s = self.server_model.objects.create(int_field=3, fk=fk)
+        c = self.fk_client_model.objects.get(pk=fk.pk)
+        self.assertListEqual([o.id for o in c.servermodel_set.all()], [s.pk])
+
+    def testPrefetchRelatedClientSide(self):
+        fks = [self.fk_model.objects.create(name=str(i)) for i in range(3)]
+        for i in range(6):
+            self.server_model.objects.create(int_field=i, fk=fks[i % 3])
+        expected = {fk.pk: sorted(s.pk for s in fk.servermodel_set.all())
+                    for fk in self.fk_model.objects.all()}
+        with self.mock_celery_passthrough() as apply:
+            qs = self.fk_client_model.objects.prefetch_related(
+                'servermodel_set')
+            result = {fk.id: sorted(s.id for s in fk.servermodel_set)
+                      for fk in qs}
+            # parent object is set to children
+            fk = qs[0]
+            self.assertTrue(all(s.fk is fk for s in fk.servermodel_set))
+        self.assertDictEqual(result, expected)
+        self.assertEqual(apply.call_count, 2)
+        self.assertListEqual(list(qs.rpc_trace), [])
+
+    def testPrefetchRelatedForwardFK(self):
+        with self.mock_celery_passthrough() as apply:
+            objects = list(self.client_model.objects.order_by(
+                'pk').prefetch_related('fk'))
+            self.assertEqual(apply.call_count, 2)
+            self.assertEqual(objects[0].fk.id, self.s1.fk_id)
+            self.assertIsNone(objects[1].fk)
+            self.assertEqual(apply.call_count, 2)
+
+    def testForwardFKSiblingsNotSaved(self):
+        obj, = self.client_model.objects.filter(pk=self.s1.pk)
+        self.assertEqual(obj.fk.id, self.s1.fk_id)
+        obj.int_field = 100500
+        obj.save()
+        self.s1.refresh_from_db()
+        self.assertEqual(self.s1.int_field, 100500)
+        state = pickle.loads(pickle.dumps(obj)).__dict__
+        self.assertNotIn('_rpc_siblings', state)
+
+
+class ColumnarResultsMixin(object):
+    """ Runs QuerySet tests with columnar fetch results format."""
+
+    def setUp(self):
+        super(ColumnarResultsMixin, self).setUp()
+        client = RpcClient.from_db(self.client_model.Rpc.db)
+        p = mock.patch.object(client, 'columnar', True)
+        p.start()
+        self.addCleanup(p.stop)
+
+
+class DjangoColumnarQuerySetTestCase(ColumnarResultsMixin,
+                                     DjangoQuerySetTestCase):
+
+    def testLazyParsesValuesOnAccess(self):
+        p, = self.client_model.objects.filter(pk=self.s1.pk).lazy()
+        row, index = p._row, p._result.index
+        self.assertIsInstance(row[index['d_field']], six.string_types)
+        self.assertEqual(p.d_field, self.s1.d_field)
+        self.assertEqual(row[index['d_field']], self.s1.d_field)
+        self.assertIsInstance(row[index['dt_field']], six.string_types)
+        self.assertEqual(p.materialize().dt_field, self.s1.dt_field)
+
+
+class NativeColumnarQuerySetTestCase(ColumnarResultsMixin,
+                                     NativeQuerySetTestCase):
+    pass
+
+
+class CodecMixin(object):
+    """ Runs QuerySet tests with another celery serializer."""
+    dumps = loads = None
+
+    def setUp(self):
+        super(CodecMixin, self).setUp()
+        dumps, loads = self.dumps, self.loads
+        p = mock.patch('rpc_client.tests.base.encode_decode',
+                       side_effect=lambda data: loads(dumps(data)))
+        p.start()
+        self.addCleanup(p.stop)
+        p = mock.patch.object(BaseRpcTask, 'typed_results', True)
+        p.start()
+        self.addCleanup(p.stop)
+        client = RpcClient.from_db(self.client_model.Rpc.db)
+        p = mock.patch.object(client, 'typed_results', True)
+        p.start()
+        self.addCleanup(p.stop)
+
+
+@skipIf(codecs.msgpack is None, "msgpack is not installed")
+class DjangoMsgpackQuerySetTestCase(CodecMixin, DjangoQuerySetTestCase):
+    dumps = staticmethod(codecs.x_rpc_msgpack_dumps)
+    loads = staticmethod(codecs.x_rpc_msgpack_loads)
+
+
+class DjangoJson2QuerySetTestCase(CodecMixin, DjangoQuerySetTestCase):
+    dumps = staticmethod(codecs.x_rpc_json2_dumps)
+    loads = staticmethod(codecs.x_rpc_json2_loads)
+
+
+class NativeJson2QuerySetTestCase(CodecMixin, NativeQuerySetTestCase):
+    dumps = staticmethod(codecs.x_rpc_json2_dumps)
+    loads = staticmethod(codecs.x_rpc_json2_loads)
+
+
+class DjangoCompressedQuerySetTestCase(CodecMixin, DjangoQuerySetTestCase):
+    dumps, loads = map(staticmethod, codecs.compressed(
+        codecs.x_rpc_json2_dumps, codecs.x_rpc_json2_loads, 'zlib', 0))
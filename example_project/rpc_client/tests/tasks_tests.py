@@ -0,0 +1,175 @@
+# coding: utf-8
+from django.db import connection
+from django.db.models import Count, Max
+from django.test import TestCase
+from mock import mock
+
+from django_rpc.celery import tasks
+from rpc_server.models import ServerModel, FKModel
+
+
+class SerializerCacheTestCase(TestCase):
+
+    def setUp(self):
+        super(SerializerCacheTestCase, self).setUp()
+        tasks.BaseRpcTask.serializer_cache.clear()
+
+    def testSerializerClassReused(self):
+        task = tasks.fetch
+        s1 = task.get_serializer_class(ServerModel, ['id', 'char_field'])
+        s2 = task.get_serializer_class(ServerModel, ('id', 'char_field'))
+        s3 = task.get_serializer_class(ServerModel, ['id', 'int_field'])
+        self.assertIs(s1, s2)
+        self.assertIsNot(s1, s3)
+
+    def testNestedSerializerReused(self):
+        task = tasks.fetch
+        fields = task.get_fields(ServerModel)
+        s1 = task.get_serializer_class(ServerModel, fields, ['fk'])
+        nested = s1._declared_fields['fk']
+        self.assertIs(type(nested), task.get_serializer_class(FKModel))
+
+    def testNestedProjection(self):
+        task = tasks.fetch
+        fields = task.get_fields(ServerModel)
+        s1 = task.get_serializer_class(ServerModel, fields, ['fk'],
+                                       {'fk': ('id',)})
+        s2 = task.get_serializer_class(ServerModel, fields, ['fk'])
+        self.assertIsNot(s1, s2)
+        nested = s1._declared_fields['fk']
+        self.assertListEqual(list(nested.fields.keys()), ['id'])
+
+    def testSplitNested(self):
+        task = tasks.fetch
+        fields, nested = task.split_nested(['id', 'fk__name', 'fk__id'])
+        self.assertListEqual(fields, ['id'])
+        self.assertDictEqual(nested, {'fk': ['name', 'id']})
+        self.assertDictEqual(
+            task.get_nested_fields(ServerModel, ['fk'], {}, {'fk': ['name']}),
+            {'fk': ('id',)})
+        self.assertDictEqual(
+            task.get_nested_fields(ServerModel, ['fk'], {'fk': ['name']}, {}),
+            {'fk': ('name', 'id')})
+
+    def testWarmUp(self):
+        tasks.warm_serializer_cache()
+        cache = tasks.BaseRpcTask.serializer_cache
+        hits = cache.hits
+        tasks.fetch.get_serializer_class(ServerModel)
+        self.assertEqual(cache.hits, hits + 1)
+
+
+class FlatSerializationTestCase(TestCase):
+    fixtures = ['tests.json']
+
+    def testSameAsSerializer(self):
+        task = tasks.fetch
+        fields = task.get_fields(ServerModel)
+        qs = ServerModel.objects.order_by('pk')
+        converters = task.get_flat_converters(ServerModel, fields)
+        self.assertIsNotNone(converters)
+        expected = task.serialize(qs, model=ServerModel, fields=fields)
+        result = task.serialize_flat(qs, fields, converters)
+        self.assertListEqual(result, [dict(row) for row in expected])
+
+    def testNestedFallback(self):
+        task = tasks.fetch
+        fields = task.get_fields(ServerModel) + ['fk']
+        self.assertIsNone(task.get_flat_converters(ServerModel, fields))
+        fields = task.get_fields(ServerModel) + ['some_annotation']
+        self.assertIsNone(task.get_flat_converters(ServerModel, fields))
+
+
+class ColumnarResultsTestCase(TestCase):
+    fixtures = ['tests.json']
+
+    def testColumnarRows(self):
+        trace = [('order_by', ('pk',), {})]
+        rows = tasks.fetch.run('rpc_server', 'ServerModel', trace)
+        data = tasks.fetch.run('rpc_server', 'ServerModel', trace,
+                               columnar=True)
+        self.assertListEqual(sorted(data.keys()), ['columns', 'rows'])
+        self.assertListEqual(data['columns'], list(rows[0].keys()))
+        self.assertListEqual(data['rows'],
+                             [list(row.values()) for row in rows])
+
+    def testColumnarNested(self):
+        data = tasks.fetch.run('rpc_server', 'ServerModel', [],
+                               extra_fields=['fk'], columnar=True)
+        self.assertIn('fk', data['columns'])
+        self.assertEqual(len(data['rows']), ServerModel.objects.count())
+
+    def testColumnarValuesList(self):
+        trace = [('values_list', ('pk',), {'flat': True})]
+        data = tasks.fetch.run('rpc_server', 'ServerModel', trace,
+                               native=True, columnar=True)
+        self.assertIsNone(data['columns'])
+        self.assertListEqual(sorted(data['rows']), [1, 2])
+
+    def testColumnarAggregate(self):
+        """ Results of same shape as columnar envelope are wrapped too."""
+        trace = [('aggregate', (), {'columns': Count('id'),
+                                    'rows': Max('id')})]
+        data = tasks.fetch.run('rpc_server', 'ServerModel', trace,
+                               native=True, columnar=True)
+        self.assertDictEqual(data, {'columns': None,
+                                    'rows': {'columns': 2, 'rows': 2}})
+
+    def testColumnarValuesRows(self):
+        trace = [('order_by', ('pk',), {}), ('values', ('id',), {})]
+        data = tasks.fetch.run('rpc_server', 'ServerModel', trace,
+                               native=True, columnar=True)
+        self.assertDictEqual(data, {'columns': ['id'], 'rows': [[1], [2]]})
+
+
+class BulkUpdateTestCase(TestCase):
+
+    def setUp(self):
+        super(BulkUpdateTestCase, self).setUp()
+        self.fk = FKModel.objects.create()
+        self.objs = [ServerModel.objects.create(int_field=i, fk=self.fk)
+                     for i in range(5)]
+
+    def testBatches(self):
+        other = FKModel.objects.create()
+        rows = [[obj.pk, obj.int_field * 10, other.pk] for obj in self.objs]
+        ops = connection.ops
+        with mock.patch.object(type(ops), 'bulk_batch_size',
+                               return_value=2) as batch_size:
+            updated = tasks.bulk_update.run(
+                'rpc_server', 'ServerModel', ['int_field', 'fk'], rows)
+        self.assertTrue(batch_size.called)
+        self.assertEqual(updated, 5)
+        values = ServerModel.objects.filter(
+            pk__in=[obj.pk for obj in self.objs]).order_by('pk').values_list(
+            'int_field', 'fk_id')
+        self.assertListEqual(list(values),
+                             [(i * 10, other.pk) for i in range(5)])
+
+    def testEmpty(self):
+        self.assertEqual(
+            tasks.bulk_update.run('rpc_server', 'ServerModel', ['int_field'],
+                                  []), 0)
+
+    def testInvalidFields(self):
+        rows = [[obj.pk, 1] for obj in self.objs]
+        for model, name in (('ServerModel', 'id'),
+                            ('FKModel', 'servermodel')):
+            with self.assertRaises(ValueError):
+                tasks.bulk_update.run('rpc_server', model, [name], rows)
+        self.assertListEqual(
+            list(ServerModel.objects.order_by('pk').values_list(
+                'int_field', flat=True)), list(range(5)))
+
+
+class UpdateTestCase(TestCase):
+
+    def testSingleMissingRow(self):
+        trace = [('filter', (), {'pk': 100500})]
+        with self.assertRaises(ServerModel.DoesNotExist):
+            tasks.update.run('rpc_server', 'ServerModel', trace,
+                             {'int_field': 1}, single=True)
+        self.assertEqual(
+            tasks.update.run('rpc_server', 'ServerModel', trace,
+                             {'int_field': 1}, single=True, missing_ok=True),
+            0)